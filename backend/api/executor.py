@@ -0,0 +1,125 @@
+"""
+executor.py
+
+Dedicated, bounded worker pool for factor and ranking work so CPU-heavy
+requests do not share Starlette's default thread pool with everything else.
+Requests beyond the pool's capacity are rejected instead of queueing forever.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import numpy as np
+
+
+class ComputeOverloaded(Exception):
+    """Raised when the compute queue is full."""
+
+
+class ComputeTimeout(Exception):
+    """Raised when a compute job does not finish in time."""
+
+
+class ComputeExecutor:
+    """
+    Thread pool with a bounded backlog, per-job timeout and latency stats.
+
+    At most max_workers jobs run at once and at most max_queue wait behind
+    them; anything beyond that raises ComputeOverloaded.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 32,
+        timeout: float = 30.0,
+        window: int = 1024,
+    ) -> None:
+        self.max_workers: int = max_workers
+        self.max_queue: int = max_queue
+        self.timeout: float = timeout
+        self.pool: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="compute"
+        )
+
+        self.pending: int = 0
+        self.completed: int = 0
+        self.rejected: int = 0
+        self.timed_out: int = 0
+        self.queue_times: deque[float] = deque(maxlen=window)
+        self.run_times: deque[float] = deque(maxlen=window)
+
+    @classmethod
+    def from_env(cls) -> "ComputeExecutor":
+        return cls(
+            max_workers=int(os.environ.get("COMPUTE_WORKERS", 4)),
+            max_queue=int(os.environ.get("COMPUTE_QUEUE", 32)),
+            timeout=float(os.environ.get("COMPUTE_TIMEOUT", 30.0)),
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def release(self, _: Any = None) -> None:
+        self.pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Runs fn on the compute pool. Must be awaited from the event loop.
+        """
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise ComputeOverloaded(
+                f"Compute queue full ({self.pending}/{self.capacity} jobs)"
+            )
+
+        submitted: float = time.perf_counter()
+
+        def timed() -> Any:
+            started: float = time.perf_counter()
+            self.queue_times.append(started - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.run_times.append(time.perf_counter() - started)
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        self.pending += 1
+        future: asyncio.Future = loop.run_in_executor(self.pool, timed)
+        # The slot is only freed when the job really finishes, even after a timeout
+        future.add_done_callback(self.release)
+
+        try:
+            result: Any = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise ComputeTimeout(f"Compute job exceeded {self.timeout}s")
+
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        def percentiles(samples: deque[float]) -> dict[str, float | None]:
+            if not samples:
+                return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+            p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+            return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_wait": percentiles(self.queue_times),
+            "run_time": percentiles(self.run_times),
+        }
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
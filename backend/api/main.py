@@ -5,20 +5,47 @@ FastAPI entry point for the stock factor ranking system.
 Exposes endpoints for factor inspection and composite stock ranking.
 """
 
-from typing import Any
+import base64
+import binascii
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, create_model
 
-from backend.data.provider import Provider
-from backend.data_store.storage import DataStore
-from backend.factors.factor_model import FactorCalculator
-from backend.fundamentals.fundamental_calculator import FundamentalCalculator
-from backend.metrics.metric_builder import MetricBuilder
+from backend.api.executor import ComputeExecutor, ComputeOverloaded, ComputeTimeout
+from backend.api.serialization import (
+    FastJSONResponse,
+    encode_factors,
+    encode_ranking,
+    negotiate,
+)
+from backend.api.state import ServiceState
+from backend.factors.registry import DEFAULT_REGISTRY
 from backend.ranking.ranking_engine import RankingEngine
 
-app = FastAPI()
+# SYSTEM INITIALIZATION
+
+state: ServiceState = ServiceState(os.environ.get("DATA_STORE_PATH", "./data_store"))
+compute: ComputeExecutor = ComputeExecutor.from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Warm-up runs in the background so the port binds immediately
+    state.start()
+    state.schedule_from_env()
+    yield
+    state.stop()
+    compute.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,58 +55,387 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# SYSTEM INITIALIZATION
 
-store = DataStore("./data_store")
-provider: Provider = Provider(store)
-fundamentals: FundamentalCalculator = FundamentalCalculator(provider)
-metric_builder: MetricBuilder = MetricBuilder(fundamentals, store)
-factors: FactorCalculator = FactorCalculator(metric_builder)
-ranker: RankingEngine = RankingEngine(factors)
+@app.middleware("http")
+async def add_timing(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    start: float = time.perf_counter()
+    response: Response = await call_next(request)
+    elapsed_ms: float = (time.perf_counter() - start) * 1000
+    response.headers["Server-Timing"] = f"total;dur={elapsed_ms:.2f}"
+    return response
+
+
+@app.exception_handler(ComputeOverloaded)
+async def compute_overloaded(request: Request, exc: ComputeOverloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(ComputeTimeout)
+async def compute_timeout(request: Request, exc: ComputeTimeout) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+def get_ranker() -> RankingEngine:
+    """
+    Returns the ranking engine of the current snapshot, or 503 while
+    warm-up is still running. Each request resolves the snapshot once, so a
+    concurrent refresh never changes the data underneath it.
+    """
+    ranker: RankingEngine | None = state.ranker
+    if ranker is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service warming up ({state.status})",
+            headers={"Retry-After": "5"},
+        )
+    return ranker
 
 
 @app.get("/")
 def root() -> dict[str, Any]:
     return {
         "name": "Stock Factor Ranking API",
-        "status": "running",
-        "endpoints": ["/rank", "/factors"],
+        "status": "running" if state.ready else state.status,
+        "endpoints": [
+            "/rank",
+            "/rank/batch",
+            "/rank/{ticker}",
+            "/ticker/{symbol}",
+            "/factors",
+            "/stats",
+            "/admin/refresh",
+            "/healthz",
+            "/readyz",
+        ],
     }
 
 
+# HEALTH AND READINESS
+
+
+@app.get("/healthz")
+def healthz() -> dict[str, Any]:
+    return {"status": "ok", "warm_up": state.status}
+
+
+@app.get("/readyz")
+def readyz() -> JSONResponse:
+    return JSONResponse(
+        status_code=200 if state.ready else 503, content=state.progress()
+    )
+
+
+# BACKGROUND REFRESH
+
+
+@app.post("/admin/refresh", status_code=202)
+def refresh() -> JSONResponse:
+    """
+    Starts a background rebuild; the current snapshot keeps serving until
+    the new one is swapped in.
+    """
+    if not state.refresh_in_background():
+        return JSONResponse(
+            status_code=409,
+            content={"detail": "Refresh already running in this or another worker"},
+        )
+    return JSONResponse(status_code=202, content={"status": "started"})
+
+
+# CONDITIONAL REQUESTS
+
+# Clients and proxies may store responses but must revalidate with If-None-Match
+CACHE_HEADERS: dict[str, str] = {"Cache-Control": "public, no-cache", "Vary": "Accept"}
+
+
+def entity_tag(version: str, *parts: Any) -> str:
+    """
+    ETag for a representation of the given snapshot version. The parts
+    (format, weights, paging, ...) distinguish responses within a version.
+    """
+    digest: str = hashlib.sha1(repr(parts).encode()).hexdigest()[:8]
+    return f'"{version}-{digest}"'
+
+
+def not_modified(if_none_match: str | None, tag: str) -> Response | None:
+    """
+    Returns a 304 response when If-None-Match matches the current tag.
+    """
+    if if_none_match is None:
+        return None
+
+    candidates: set[str] = {
+        t.strip().removeprefix("W/") for t in if_none_match.split(",")
+    }
+    if "*" in candidates or tag in candidates:
+        return Response(status_code=304, headers={"ETag": tag, **CACHE_HEADERS})
+    return None
+
+
 # GET FACTOR SCORES
 
 
+def factors_response(ranker: RankingEngine, fmt: str) -> Response:
+    scores: dict[str, dict] = ranker.load_factor_scores()
+    response: Response = encode_factors(
+        fmt,
+        scores,
+        ranker.tickers,
+        ranker.factor_names,
+        ranker.factor_array(),
+        ranker.scores_version,
+    )
+    response.headers["ETag"] = entity_tag(ranker.scores_version, fmt)
+    return response
+
+
 @app.get("/factors")
-def get_factors() -> dict[str, dict]:
-    return {
-        "value": factors.value_score_calculator(),
-        "size": factors.size_score_calculator(),
-        "momentum": factors.momentum_score_calculator(),
-        "lowvol": factors.lowvol_score_calculator(),
-        "quality": factors.quality_score_calculator(),
-        "market_risk": factors.market_risk_score_calculator(),
-    }
+async def get_factors(
+    accept: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    ranker: RankingEngine = get_ranker()
+    fmt: str = negotiate(accept)
+
+    # Answered on the event loop without touching the compute pool
+    cached: Response | None = not_modified(
+        if_none_match, entity_tag(ranker.factor_calc.metrics_version, fmt)
+    )
+    if cached is not None:
+        return cached
+
+    response: Response = await compute.run(factors_response, ranker, fmt)
+    response.headers.update(CACHE_HEADERS)
+    return response
 
 
 # INPUT MODEL FOR WEIGHTS
 
 
-class FactorWeights(BaseModel):
-    value: float
-    size: float
-    momentum: float
-    lowvol: float
-    quality: float
-    market_risk: float
+# One required weight per registered factor, so new factors need no API changes
+FactorWeights: type[BaseModel] = create_model(
+    "FactorWeights", **{name: (float, ...) for name in DEFAULT_REGISTRY.factors}
+)
 
 
 # RANKING ENDPOINT
 
 
+def encode_cursor(version: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{version}:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """
+    Returns the offset stored in a cursor. Cursors are bound to the
+    snapshot version they were issued for.
+    """
+    try:
+        cursor_version, offset = base64.urlsafe_b64decode(cursor).decode().split(":")
+        offset_value: int = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if cursor_version != version:
+        raise HTTPException(
+            status_code=409, detail="Cursor is from an older snapshot; restart paging"
+        )
+
+    return offset_value
+
+
+def rank_page_response(
+    ranker: RankingEngine,
+    weights: dict,
+    limit: int | None,
+    offset: int,
+    cursor: str | None,
+    sector: list[str] | None,
+    min_market_cap: float | None,
+    max_per_sector: int | None,
+    fmt: str,
+) -> Response:
+    """
+    Ranks and encodes one page on the compute pool.
+    """
+    ranker.ensure_loaded()
+    version: str = ranker.scores_version
+
+    if cursor is not None:
+        offset = decode_cursor(cursor, version)
+
+    rows, composite, total = ranker.page_rows(
+        weights, offset, limit, sector, min_market_cap, max_per_sector
+    )
+
+    next_offset: int = offset + len(rows)
+    next_cursor: str | None = (
+        encode_cursor(version, next_offset)
+        if limit is not None and next_offset < total
+        else None
+    )
+
+    meta: dict[str, Any] = {
+        "total": total,
+        "offset": offset,
+        "next_cursor": next_cursor,
+    }
+    response: Response = encode_ranking(fmt, ranker.tickers, rows, composite, meta)
+    response.headers["ETag"] = entity_tag(
+        version,
+        *rank_tag_parts(
+            weights, limit, offset, sector, min_market_cap, max_per_sector, fmt
+        ),
+    )
+    return response
+
+
+def rank_tag_parts(
+    weights: dict,
+    limit: int | None,
+    offset: int,
+    sector: list[str] | None,
+    min_market_cap: float | None,
+    max_per_sector: int | None,
+    fmt: str,
+) -> tuple:
+    return (
+        sorted(weights.items()),
+        limit,
+        offset,
+        sorted(sector) if sector else None,
+        min_market_cap,
+        max_per_sector,
+        fmt,
+    )
+
+
 @app.post("/rank")
-def rank_stocks(weights: FactorWeights) -> dict[str, list]:
-    ranker.load_factor_scores()
-    composite: dict = ranker.compute_composite_scores(weights.dict())
-    ranked: list = ranker.rank_stocks(composite)
-    return {"ranked_stocks": ranked}
+async def rank_stocks(
+    weights: FactorWeights,
+    limit: int | None = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+    cursor: str | None = None,
+    sector: list[str] | None = Query(default=None),
+    min_market_cap: float | None = Query(default=None, ge=0),
+    max_per_sector: int | None = Query(default=None, ge=1),
+    accept: str | None = Header(default=None),
+) -> Response:
+    fmt: str = negotiate(accept)
+    return await compute.run(
+        rank_page_response,
+        get_ranker(),
+        weights.dict(),
+        limit,
+        offset,
+        cursor,
+        sector,
+        min_market_cap,
+        max_per_sector,
+        fmt,
+    )
+
+
+@app.get("/rank")
+async def rank_stocks_get(
+    weights: FactorWeights = Depends(),
+    limit: int | None = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+    cursor: str | None = None,
+    sector: list[str] | None = Query(default=None),
+    min_market_cap: float | None = Query(default=None, ge=0),
+    max_per_sector: int | None = Query(default=None, ge=1),
+    accept: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """
+    Cacheable variant of POST /rank with the weights in the query string,
+    e.g. GET /rank?value=0.2&size=0.2&momentum=0.2&lowvol=0.15&quality=0.15&market_risk=0.1
+    """
+    ranker: RankingEngine = get_ranker()
+    fmt: str = negotiate(accept)
+
+    version: str = ranker.factor_calc.metrics_version
+    if cursor is not None:
+        offset, cursor = decode_cursor(cursor, version), None
+
+    tag: str = entity_tag(
+        version,
+        *rank_tag_parts(
+            weights.dict(), limit, offset, sector, min_market_cap, max_per_sector, fmt
+        ),
+    )
+    cached: Response | None = not_modified(if_none_match, tag)
+    if cached is not None:
+        return cached
+
+    response: Response = await compute.run(
+        rank_page_response,
+        ranker,
+        weights.dict(),
+        limit,
+        offset,
+        cursor,
+        sector,
+        min_market_cap,
+        max_per_sector,
+        fmt,
+    )
+    response.headers.update(CACHE_HEADERS)
+    return response
+
+
+# BATCH SCENARIO RANKING
+
+
+class ScenarioBatch(BaseModel):
+    scenarios: list[FactorWeights] = Field(min_length=1, max_length=1000)
+    top_n: int = Field(default=20, ge=1)
+
+
+@app.post("/rank/batch")
+async def rank_scenarios(batch: ScenarioBatch) -> dict[str, Any]:
+    return await compute.run(
+        get_ranker().rank_scenarios, [w.dict() for w in batch.scenarios], batch.top_n
+    )
+
+
+# CACHE STATISTICS
+
+
+@app.get("/stats")
+def get_stats() -> dict[str, Any]:
+    return {"rank_cache": get_ranker().cache_stats(), "compute": compute.stats()}
+
+
+# SINGLE TICKER RANK LOOKUP
+
+
+@app.post("/rank/{ticker}")
+async def rank_ticker(ticker: str, weights: FactorWeights) -> dict[str, Any]:
+    symbol: str = ticker.strip().upper().replace(".", "-")
+    result: dict[str, Any] | None = await compute.run(
+        get_ranker().ticker_rank, symbol, weights.dict()
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"{symbol} is not ranked")
+    return result
+
+
+# TICKER DETAIL
+
+
+@app.get("/ticker/{symbol}")
+def ticker_detail(symbol: str) -> dict[str, Any]:
+    """
+    Served from the snapshot's in-memory indexes; never fetches data.
+    """
+    ticker: str = symbol.strip().upper().replace(".", "-")
+    detail: dict[str, Any] | None = get_ranker().ticker_detail(ticker)
+    if detail is None:
+        raise HTTPException(status_code=404, detail=f"{ticker} is not in the snapshot")
+    return detail
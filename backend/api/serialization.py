@@ -0,0 +1,267 @@
+"""
+serialization.py
+
+Response encoding for factor and ranking payloads.
+JSON is rendered with orjson when it is installed (NumPy arrays natively,
+NaN as null) and bypasses FastAPI's jsonable_encoder. Clients can also ask
+for a column-wise layout, as compact JSON or as an Arrow IPC stream, via
+the Accept header, or stream newline-delimited JSON records in chunks.
+"""
+
+import json
+import math
+from typing import Any, Iterator
+
+import numpy as np
+import pyarrow as pa
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+JSON: str = "application/json"
+COLUMNAR_JSON: str = "application/vnd.factors.columnar+json"
+ARROW: str = "application/vnd.apache.arrow.stream"
+NDJSON: str = "application/x-ndjson"
+
+FORMATS: tuple[str, ...] = (JSON, COLUMNAR_JSON, ARROW, NDJSON)
+
+# Records encoded per streamed chunk
+CHUNK_SIZE: int = 1000
+
+
+# -------------------------------
+# Content negotiation
+# -------------------------------
+
+
+def negotiate(accept: str | None) -> str:
+    """
+    Picks the response format from an Accept header (JSON by default).
+    Raises 406 if the header only lists unsupported types.
+    """
+    if not accept:
+        return JSON
+
+    best: str | None = None
+    best_q: float = 0.0
+
+    for part in accept.split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q: float = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+
+        if media_type in ("*/*", "application/*"):
+            media_type = JSON
+        if media_type in FORMATS and q > best_q:
+            best, best_q = media_type, q
+
+    if best is None:
+        raise HTTPException(
+            status_code=406, detail=f"Supported formats: {', '.join(FORMATS)}"
+        )
+    return best
+
+
+# -------------------------------
+# JSON
+# -------------------------------
+
+
+def sanitize(value: Any) -> Any:
+    """
+    Plain-Python copy with NaN replaced by None, for the stdlib fallback.
+    """
+    if isinstance(value, dict):
+        return {k: sanitize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [sanitize(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return sanitize(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def dumps(content: Any) -> bytes:
+    """
+    NaN-safe JSON encoding of dicts, lists, tuples and NumPy values.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(sanitize(content), separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps().
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# -------------------------------
+# Arrow
+# -------------------------------
+
+
+def arrow_bytes(columns: dict[str, Any], metadata: dict[str, Any]) -> bytes:
+    """
+    Encodes equal-length columns as an Arrow IPC stream (NaN becomes null).
+    Scalar metadata is stored as JSON strings on the schema.
+    """
+    table: pa.Table = pa.table(
+        {name: pa.array(values, from_pandas=True) for name, values in columns.items()}
+    )
+    table = table.replace_schema_metadata(
+        {k: json.dumps(v) for k, v in metadata.items()}
+    )
+
+    sink: pa.BufferOutputStream = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# -------------------------------
+# NDJSON
+# -------------------------------
+
+
+def ranking_lines(
+    tickers: list[str],
+    rows: np.ndarray,
+    composite: np.ndarray,
+    offset: int,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    {"rank", "ticker", "score"} records in rank order, one chunk at a time.
+    """
+    for start in range(0, len(rows), chunk_size):
+        chunk: np.ndarray = rows[start : start + chunk_size]
+        yield b"".join(
+            dumps({"rank": offset + start + i + 1, "ticker": tickers[r], "score": s})
+            + b"\n"
+            for i, (r, s) in enumerate(zip(chunk, composite[chunk].tolist()))
+        )
+
+
+def factor_lines(
+    tickers: list[str],
+    factor_names: list[str],
+    matrix: np.ndarray,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    {"ticker", <factor>: score, ...} records in universe order, one chunk at a time.
+    """
+    for start in range(0, len(tickers), chunk_size):
+        chunk: list = matrix[start : start + chunk_size].tolist()
+        yield b"".join(
+            dumps(
+                {
+                    "ticker": tickers[start + i],
+                    **{name: v for name, v in zip(factor_names, values)},
+                }
+            )
+            + b"\n"
+            for i, values in enumerate(chunk)
+        )
+
+
+# -------------------------------
+# Payload encoders
+# -------------------------------
+
+
+def encode_factors(
+    fmt: str,
+    scores: dict[str, dict],
+    tickers: list[str],
+    factor_names: list[str],
+    matrix: np.ndarray,
+    version: str | None,
+) -> Response:
+    """
+    Factor scores as {factor: {ticker: score}} JSON, or column-wise with
+    one tickers array and one score array per factor (NaN = missing).
+    """
+    if fmt == NDJSON:
+        return StreamingResponse(
+            factor_lines(tickers, factor_names, matrix),
+            media_type=NDJSON,
+            headers={"X-Snapshot-Version": str(version)},
+        )
+
+    by_factor: np.ndarray = np.ascontiguousarray(matrix.T)
+
+    if fmt == ARROW:
+        columns: dict[str, Any] = {"ticker": tickers}
+        columns.update({name: by_factor[j] for j, name in enumerate(factor_names)})
+        return Response(arrow_bytes(columns, {"version": version}), media_type=ARROW)
+
+    if fmt == COLUMNAR_JSON:
+        content: dict[str, Any] = {
+            "version": version,
+            "tickers": tickers,
+            "factors": {name: by_factor[j] for j, name in enumerate(factor_names)},
+        }
+        return Response(dumps(content), media_type=COLUMNAR_JSON)
+
+    return Response(dumps(scores), media_type=JSON)
+
+
+def encode_ranking(
+    fmt: str,
+    tickers: list[str],
+    rows: np.ndarray,
+    composite: np.ndarray,
+    meta: dict[str, Any],
+) -> Response:
+    """
+    One ranking page as {"ranked_stocks": [[ticker, score], ...], **meta},
+    or column-wise as parallel tickers and scores arrays, or streamed as one
+    record per line with the paging fields in headers.
+    """
+    if fmt == NDJSON:
+        headers: dict[str, str] = {"X-Total-Count": str(meta["total"])}
+        if meta.get("next_cursor"):
+            headers["X-Next-Cursor"] = meta["next_cursor"]
+        return StreamingResponse(
+            ranking_lines(tickers, rows, composite, meta["offset"]),
+            media_type=NDJSON,
+            headers=headers,
+        )
+
+    page_tickers: list[str] = [tickers[i] for i in rows]
+    page_scores: np.ndarray = composite[rows]
+
+    if fmt == ARROW:
+        columns: dict[str, Any] = {"ticker": page_tickers, "score": page_scores}
+        return Response(arrow_bytes(columns, meta), media_type=ARROW)
+
+    if fmt == COLUMNAR_JSON:
+        content: dict[str, Any] = {
+            "tickers": page_tickers,
+            "scores": page_scores,
+            **meta,
+        }
+        return Response(dumps(content), media_type=COLUMNAR_JSON)
+
+    content = {"ranked_stocks": list(zip(page_tickers, page_scores.tolist())), **meta}
+    return Response(dumps(content), media_type=JSON)
@@ -0,0 +1,486 @@
+"""
+state.py
+
+Holds the services behind the API and builds them in the background,
+so the server can bind its port and report readiness while the factor
+universe is still loading. Refreshed data is built into a new snapshot
+and swapped in atomically, so requests never see a half-built state.
+
+Computed snapshots are also written to the DataStore as memory-mapped
+arrays. With several uvicorn workers, one builds while the others wait on
+a file lock and then map its output; later refreshes are picked up by polling.
+"""
+
+import datetime as dt
+import os
+import threading
+import time
+from contextlib import ExitStack
+from typing import Any, Callable
+from zoneinfo import ZoneInfo
+
+from backend.data.provider import Provider
+from backend.data.refresh_planner import RefreshPlanner
+from backend.data.universe import load_sp500_universe
+from backend.data_store.storage import DataStore
+from backend.factors.factor_model import FactorCalculator
+from backend.factors.shared_snapshot import SharedFactorSnapshot
+from backend.fundamentals.fundamental_calculator import FundamentalCalculator
+from backend.metrics.metric_builder import MetricBuilder
+from backend.ranking.ranking_engine import RankingEngine
+
+REFRESH_CATEGORIES: tuple[str, ...] = ("price_history", "fundamentals", "metadata")
+
+# How often a starting worker checks for a snapshot built by another process
+BUILDER_POLL_SECONDS: float = 0.5
+
+
+class Snapshot:
+    """
+    A fully built factor calculator and ranking engine pair.
+    Never mutated once published; requests read one snapshot for their lifetime.
+    """
+
+    def __init__(
+        self,
+        factors: FactorCalculator | SharedFactorSnapshot,
+        ranker: RankingEngine,
+        source: str,
+    ) -> None:
+        self.factors: FactorCalculator | SharedFactorSnapshot = factors
+        self.ranker: RankingEngine = ranker
+        self.source: str = source
+        self.version: str = factors.metrics_version
+        self.built_at: float = time.time()
+
+
+class ServiceState:
+    """
+    Data layer plus the currently served snapshot.
+    """
+
+    def __init__(self, data_path: str = "./data_store") -> None:
+        self.store: DataStore = DataStore(data_path)
+        self.provider: Provider = Provider(self.store)
+        self.fundamentals: FundamentalCalculator = FundamentalCalculator(self.provider)
+        self.metric_builder: MetricBuilder = MetricBuilder(
+            self.fundamentals, self.store
+        )
+
+        self.snapshot: Snapshot | None = None
+
+        self.status: str = "starting"
+        self.source: str | None = None
+        self.error: str | None = None
+        self.started_at: float = time.time()
+        self.ready_at: float | None = None
+        self.thread: threading.Thread | None = None
+
+        self.refresh_lock: threading.Lock = threading.Lock()
+        self.refresh_builder: MetricBuilder | None = None
+        self.refresh_status: str = "idle"
+        self.refresh_error: str | None = None
+        self.last_refresh: float | None = None
+        self.next_refresh: dt.datetime | None = None
+        self.stop_event: threading.Event = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None
+
+    @property
+    def factors(self) -> FactorCalculator | SharedFactorSnapshot | None:
+        return self.snapshot.factors if self.snapshot is not None else None
+
+    @property
+    def ranker(self) -> RankingEngine | None:
+        return self.snapshot.ranker if self.snapshot is not None else None
+
+    def publish(
+        self, factors: FactorCalculator | SharedFactorSnapshot, source: str
+    ) -> Snapshot:
+        """
+        Precomputes everything the serving path needs, then swaps the snapshot
+        in with a single reference assignment.
+        """
+        ranker: RankingEngine = RankingEngine(factors)
+        ranker.ensure_loaded()
+        if isinstance(factors, FactorCalculator):
+            # Computed scores are recorded in the factor history
+            factors.factor_scores()
+
+        snapshot: Snapshot = Snapshot(factors, ranker, source)
+        self.snapshot = snapshot
+        return snapshot
+
+    # -------------------------------
+    # Shared snapshot
+    # -------------------------------
+
+    def load_shared(self) -> SharedFactorSnapshot | None:
+        """
+        Maps the current shared snapshot, unless it cannot be mapped (e.g. an
+        older layout) or the universe metrics snapshot has been rewritten
+        since it was built (e.g. by refresh.py --metrics).
+        """
+        version: str | None = self.store.current_serving_version()
+        if version is None:
+            return None
+
+        try:
+            shared: SharedFactorSnapshot = SharedFactorSnapshot(self.store, version)
+        except Exception as e:
+            print(f"Could not map shared snapshot {version}: {e}")
+            return None
+
+        digest: str | None = self.store.snapshot_digest(MetricBuilder.SNAPSHOT_NAME)
+        if shared.universe_snapshot != digest:
+            print("Shared snapshot is older than the universe metrics snapshot")
+            return None
+        return shared
+
+    def share(self, factors: FactorCalculator) -> None:
+        try:
+            SharedFactorSnapshot.write(self.store, factors)
+        except Exception as e:
+            print(f"Could not write shared snapshot: {e}")
+
+    def watch(self, interval: float) -> None:
+        """
+        Maps shared snapshots published by other processes.
+        """
+        while not self.stop_event.wait(interval):
+            current: Snapshot | None = self.snapshot
+            if current is None or self.refresh_lock.locked():
+                continue
+            try:
+                version: str | None = self.store.current_serving_version()
+                if version is not None and version != current.version:
+                    self.publish(SharedFactorSnapshot(self.store, version), "shared")
+            except Exception as e:
+                print(f"Could not load shared snapshot: {e}")
+
+    # -------------------------------
+    # Warm-up
+    # -------------------------------
+
+    def start(self) -> None:
+        """
+        Starts warm-up and the shared snapshot watcher on daemon threads
+        and returns immediately. SNAPSHOT_POLL_SECONDS sets the watch interval.
+        """
+        self.thread = threading.Thread(
+            target=self.warm_up, name="factor-warm-up", daemon=True
+        )
+        self.thread.start()
+
+        interval: float = float(os.environ.get("SNAPSHOT_POLL_SECONDS", 5.0))
+        threading.Thread(
+            target=self.watch, args=(interval,), name="snapshot-watch", daemon=True
+        ).start()
+
+    def warm_up(self) -> None:
+        """
+        Maps the shared snapshot when one exists and was built from the
+        current universe snapshot. Otherwise one process takes the build lock
+        and builds the factor calculator from the persisted universe snapshot
+        (or every ticker's metrics), while the others wait and then map what
+        it wrote. Once ready, tickers that failed when the universe snapshot
+        was written are retried in the background.
+        """
+        try:
+            factors: FactorCalculator | SharedFactorSnapshot | None = self.load_shared()
+            if factors is None:
+                self.status = "waiting_for_builder"
+                factors = self.wait_for_shared()
+
+            if isinstance(factors, SharedFactorSnapshot):
+                self.source = "shared"
+
+            self.status = "computing_factors"
+            self.publish(factors, self.source)
+            self.status = "ready"
+            self.ready_at = time.time()
+
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"Warm-up failed: {e}")
+            return
+
+        self.in_background("factor-retry", self.retry_failed)
+
+    def wait_for_shared(self) -> FactorCalculator | SharedFactorSnapshot:
+        """
+        Builds and shares the factor calculator if no other process holds
+        the build lock, else maps the shared snapshot as soon as a current
+        one appears. Polls rather than waiting on the lock, so a refresh or
+        retry running elsewhere does not hold up readiness.
+        """
+        while True:
+            with self.store.serving_lock(blocking=False) as acquired:
+                if acquired:
+                    factors: FactorCalculator | SharedFactorSnapshot | None = (
+                        self.load_shared()
+                    )
+                    if factors is None:
+                        factors = self.build()
+                        self.status = "computing_factors"
+                        factors.factor_matrix()
+                        self.share(factors)
+                    return factors
+
+            time.sleep(BUILDER_POLL_SECONDS)
+            factors = self.load_shared()
+            if factors is not None:
+                return factors
+
+    def build(self) -> FactorCalculator:
+        """
+        Factor calculator from the persisted universe snapshot as it is, or
+        from every ticker's metrics when there is none.
+        """
+        snapshot: dict[str, Any] | None = None
+        try:
+            snapshot = self.metric_builder.load_universe_snapshot()
+        except Exception as e:
+            print(f"Could not read universe metrics snapshot: {e}")
+
+        if snapshot:
+            self.status, self.source = "loading_snapshot", "snapshot"
+            return FactorCalculator(self.metric_builder, metrics=snapshot["metrics"])
+
+        self.status, self.source = "building_metrics", "metrics"
+        return FactorCalculator(self.metric_builder)
+
+    # -------------------------------
+    # Refresh
+    # -------------------------------
+
+    def acquire_refresh(self) -> ExitStack | None:
+        """
+        Takes the in-process refresh lock and the cross-process build lock
+        without waiting. Returns a stack that releases both, or None if a
+        refresh is running here or in another process.
+        """
+        if not self.refresh_lock.acquire(blocking=False):
+            return None
+
+        locks: ExitStack = ExitStack()
+        locks.callback(self.refresh_lock.release)
+        if not locks.enter_context(self.store.serving_lock(blocking=False)):
+            locks.close()
+            return None
+        return locks
+
+    def refresh(self, categories: tuple[str, ...] = REFRESH_CATEGORIES) -> bool:
+        """
+        Refetches the given raw categories, plus any statements the refresh
+        planner considers due, rebuilds metrics and factor scores
+        into a new snapshot and swaps it in. The serving snapshot is untouched
+        until the new one is complete. Returns False if a refresh is running
+        here or in another process, or if the rebuild failed.
+        """
+        locks: ExitStack | None = self.acquire_refresh()
+        if locks is None:
+            return False
+
+        with locks:
+            return self.rebuild(categories)
+
+    def rebuild(self, categories: tuple[str, ...]) -> bool:
+        """
+        Refetches and rebuilds every ticker's metrics, then swaps them in.
+        """
+
+        def refreshed() -> FactorCalculator:
+            # Statements are only refetched where a new period could be out
+            planned, _ = RefreshPlanner(self.store).plan(load_sp500_universe())
+            provider: Provider = Provider(
+                self.store, refetch=set(categories), refetch_pairs=set(planned)
+            )
+            builder: MetricBuilder = MetricBuilder(
+                FundamentalCalculator(provider), self.store
+            )
+            self.refresh_builder = builder
+            return FactorCalculator(builder, force_refresh=True)
+
+        return self.swap_in(refreshed)
+
+    def retry_failed(self) -> bool:
+        """
+        Retries the tickers that failed when the universe snapshot was
+        written and swaps in a snapshot with any that now succeed.
+        """
+
+        def completed() -> FactorCalculator | None:
+            snapshot: dict[str, Any] | None = (
+                self.metric_builder.load_universe_snapshot()
+            )
+            if not snapshot or not snapshot["failed"]:
+                return None
+
+            self.refresh_builder = self.metric_builder
+            metrics: dict[str, Any] = self.metric_builder.complete_universe_snapshot(
+                snapshot
+            )
+            if all(metrics[t] is None for t in snapshot["failed"]):
+                return None
+            return FactorCalculator(self.metric_builder, metrics=metrics)
+
+        return self.swap_in(completed)
+
+    def swap_in(self, build: Callable[[], FactorCalculator | None]) -> bool:
+        """
+        Builds a new factor calculator and publishes and shares it, tracking
+        progress as a refresh. The serving snapshot is untouched until the
+        new one is complete; a build returning None leaves it in place.
+        Returns False if the build failed.
+        """
+        try:
+            self.refresh_status = "running"
+            self.refresh_error = None
+
+            factors: FactorCalculator | None = build()
+            if factors is not None:
+                self.publish(factors, "refresh")
+                self.share(factors)
+                self.last_refresh = time.time()
+
+                if self.ready_at is None:
+                    self.status, self.ready_at = "ready", time.time()
+
+            self.refresh_status = "idle"
+            return True
+
+        except Exception as e:
+            self.refresh_status = "failed"
+            self.refresh_error = str(e)
+            print(f"Refresh failed: {e}")
+            return False
+
+        finally:
+            self.refresh_builder = None
+
+    def refresh_in_background(self) -> bool:
+        """
+        Starts a refresh thread. Returns False if a refresh is already
+        running here or in another process.
+        """
+        return self.in_background(
+            "factor-refresh", lambda: self.rebuild(REFRESH_CATEGORIES)
+        )
+
+    def in_background(self, name: str, work: Callable[[], bool]) -> bool:
+        """
+        Takes the refresh locks and runs work on a thread that releases them
+        when done. Returns False if the locks are held here or elsewhere.
+        """
+        locks: ExitStack | None = self.acquire_refresh()
+        if locks is None:
+            return False
+
+        def run() -> None:
+            with locks:
+                work()
+
+        try:
+            threading.Thread(target=run, name=name, daemon=True).start()
+        except Exception:
+            locks.close()
+            raise
+        return True
+
+    # -------------------------------
+    # Schedule
+    # -------------------------------
+
+    @staticmethod
+    def next_run(now: dt.datetime, at: dt.time) -> dt.datetime:
+        """
+        Next weekday occurrence of the given wall-clock time after now.
+        """
+        candidate: dt.datetime = now.replace(
+            hour=at.hour, minute=at.minute, second=0, microsecond=0
+        )
+        if candidate <= now:
+            candidate += dt.timedelta(days=1)
+        while candidate.weekday() >= 5:
+            candidate += dt.timedelta(days=1)
+        return candidate
+
+    def schedule(self, at: str, tz: str = "America/New_York") -> None:
+        """
+        Runs a refresh every weekday at the given HH:MM in the given timezone,
+        e.g. after the market close.
+        """
+        hour, minute = (int(part) for part in at.split(":"))
+        run_at: dt.time = dt.time(hour, minute)
+        zone: ZoneInfo = ZoneInfo(tz)
+
+        def loop() -> None:
+            while True:
+                self.next_refresh = self.next_run(dt.datetime.now(zone), run_at)
+                wait: float = (
+                    self.next_refresh - dt.datetime.now(zone)
+                ).total_seconds()
+                if self.stop_event.wait(max(wait, 0.0)):
+                    return
+                self.refresh()
+
+        threading.Thread(
+            target=loop, name="factor-refresh-schedule", daemon=True
+        ).start()
+
+    def schedule_from_env(self) -> None:
+        """
+        Enables the daily refresh when REFRESH_AT (HH:MM) is set.
+        REFRESH_TZ defaults to America/New_York.
+        """
+        at: str | None = os.environ.get("REFRESH_AT")
+        if at:
+            self.schedule(at, os.environ.get("REFRESH_TZ", "America/New_York"))
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    # -------------------------------
+    # Status
+    # -------------------------------
+
+    def progress(self) -> dict[str, Any]:
+        progress: dict[str, int] = dict(self.metric_builder.progress)
+        refresh_builder: MetricBuilder | None = self.refresh_builder
+        snapshot: Snapshot | None = self.snapshot
+
+        return {
+            "ready": self.ready,
+            "status": self.status,
+            "source": self.source,
+            "error": self.error,
+            "metrics": progress,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "startup_seconds": (
+                round(self.ready_at - self.started_at, 3) if self.ready_at else None
+            ),
+            "snapshot": (
+                {
+                    "version": snapshot.version,
+                    "source": snapshot.source,
+                    "built_at": snapshot.built_at,
+                }
+                if snapshot is not None
+                else None
+            ),
+            "refresh": {
+                "status": self.refresh_status,
+                "error": self.refresh_error,
+                "last_refresh": self.last_refresh,
+                "next_refresh": (
+                    self.next_refresh.isoformat() if self.next_refresh else None
+                ),
+                "metrics": (
+                    dict(refresh_builder.progress) if refresh_builder else None
+                ),
+            },
+        }
@@ -0,0 +1,294 @@
+"""
+bundle.py
+
+Packs a DataStore into one compressed, checksummed bundle file and unpacks
+it on another node, so a new API replica starts from the same derived
+metrics and factor snapshots instead of refetching the universe, e.g.:
+
+    python -m backend.bundle export data_store.tar.gz
+    python -m backend.bundle export full.tar.gz --raw
+    python -m backend.bundle import data_store.tar.gz
+
+A bundle holds the universe metrics snapshot, the current serving snapshot,
+the factor history and every ticker's derived metrics (plus the raw cache
+with --raw). Imported serving arrays are memory-mapped in place, so an API
+started on the target store is ready as soon as it maps them.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import time
+from typing import Any
+
+from backend.data_store.storage import DataStore
+from backend.metrics.metric_builder import MetricBuilder
+
+MANIFEST: str = "MANIFEST.json"
+FORMAT_VERSION: int = 1
+
+# Top-level directories of the store that are not tickers
+STORE_DIRS: tuple[str, ...] = ("snapshots", "serving", "factor_history", "checkpoints")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def walk_files(root: str) -> list[str]:
+    """
+    Every regular file under root, relative to it.
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, names in os.walk(root)
+        for name in names
+    )
+
+
+def bundle_files(store: DataStore, raw: bool = False) -> list[str]:
+    """
+    Store-relative paths of the files that go into a bundle.
+    Lock files, checkpoints, in-progress writes and old serving versions
+    are left out.
+    """
+    base: str = store.base_path
+    files: list[str] = [
+        f"snapshots/{name}"
+        for name in walk_files(f"{base}/snapshots")
+        if name.endswith(".json")
+    ]
+
+    version: str | None = store.current_serving_version()
+    if version is not None:
+        files += [
+            f"serving/{version}/{name}"
+            for name in walk_files(store.serving_version_path(version))
+        ]
+
+    files += [f"factor_history/{name}" for name in walk_files(store.history_path())]
+
+    tickers: list[str] = sorted(
+        name
+        for name in os.listdir(base)
+        if name not in STORE_DIRS
+        and not name.startswith(".")
+        and os.path.isdir(f"{base}/{name}")
+    )
+    derived: str = f"{MetricBuilder.METRICS_CATEGORY}.json"
+    for ticker in tickers:
+        for name in walk_files(f"{base}/{ticker}"):
+            if raw or name == derived:
+                files.append(f"{ticker}/{name}")
+
+    return [f for f in files if ".tmp" not in f]
+
+
+# -------------------------------
+# Export
+# -------------------------------
+
+
+def export_bundle(store: DataStore, path: str, raw: bool = False) -> dict[str, Any]:
+    """
+    Writes a gzip-compressed tar with a manifest of every file's size and
+    SHA-256, and a <path>.sha256 file for the bundle as a whole.
+    """
+    started: float = time.perf_counter()
+    files: list[str] = bundle_files(store, raw)
+    if not files:
+        raise RuntimeError(f"Nothing to export from {store.base_path}")
+
+    manifest: dict[str, Any] = {
+        "format": FORMAT_VERSION,
+        "created_at": time.time(),
+        "serving_version": store.current_serving_version(),
+        "raw": raw,
+        "files": {
+            name: {
+                "size": os.path.getsize(f"{store.base_path}/{name}"),
+                "sha256": file_sha256(f"{store.base_path}/{name}"),
+            }
+            for name in files
+        },
+    }
+
+    tmp: str = f"{path}.tmp-{os.getpid()}"
+    with tarfile.open(tmp, "w:gz", compresslevel=6) as tar:
+        body: bytes = json.dumps(manifest, indent=1).encode()
+        info: tarfile.TarInfo = tarfile.TarInfo(MANIFEST)
+        info.size, info.mtime = len(body), int(manifest["created_at"])
+        tar.addfile(info, io.BytesIO(body))
+        for name in files:
+            tar.add(f"{store.base_path}/{name}", arcname=name, recursive=False)
+    os.replace(tmp, path)
+
+    checksum: str = file_sha256(path)
+    with open(f"{path}.sha256", "w") as f:
+        f.write(f"{checksum}  {os.path.basename(path)}\n")
+
+    return {
+        "files": len(files),
+        "bytes": sum(f["size"] for f in manifest["files"].values()),
+        "bundle_bytes": os.path.getsize(path),
+        "sha256": checksum,
+        "serving_version": manifest["serving_version"],
+        "elapsed_seconds": time.perf_counter() - started,
+    }
+
+
+# -------------------------------
+# Import
+# -------------------------------
+
+
+def verify_bundle(path: str) -> None:
+    """
+    Checks the bundle against its .sha256 file, if one sits next to it.
+    """
+    if not os.path.exists(f"{path}.sha256"):
+        print(f"No {path}.sha256 found, relying on the manifest checksums")
+        return
+
+    with open(f"{path}.sha256", "r") as f:
+        expected: str = f.read().split()[0]
+    if file_sha256(path) != expected:
+        raise RuntimeError(f"Checksum mismatch for {path}")
+
+
+def unpack(path: str, target: str) -> dict[str, Any]:
+    """
+    Extracts a bundle into target and checks every file against the
+    manifest. Returns the manifest.
+    """
+    with tarfile.open(path, "r:gz") as tar:
+        members: list[tarfile.TarInfo] = tar.getmembers()
+        for member in members:
+            name: str = os.path.normpath(member.name)
+            if not member.isfile() or name.startswith(("/", "..")):
+                raise RuntimeError(f"Unexpected bundle member: {member.name}")
+        tar.extractall(target, members=members, filter="data")
+
+    with open(f"{target}/{MANIFEST}", "r") as f:
+        manifest: dict[str, Any] = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise RuntimeError(f"Unsupported bundle format: {manifest.get('format')}")
+
+    files: dict[str, dict] = manifest["files"]
+    extracted: set[str] = set(walk_files(target)) - {MANIFEST}
+    if extracted != set(files):
+        raise RuntimeError("Bundle contents do not match its manifest")
+
+    for name, expected in files.items():
+        local: str = f"{target}/{name}"
+        if (
+            os.path.getsize(local) != expected["size"]
+            or file_sha256(local) != expected["sha256"]
+        ):
+            raise RuntimeError(f"Checksum mismatch for {name}")
+
+    return manifest
+
+
+def import_bundle(store: DataStore, path: str) -> dict[str, Any]:
+    """
+    Verifies and unpacks a bundle into the store. Files are moved into place
+    one atomic rename at a time, and the serving snapshot is published last,
+    so a running API only switches to it once everything else is in place.
+    """
+    started: float = time.perf_counter()
+    verify_bundle(path)
+
+    os.makedirs(store.base_path, exist_ok=True)
+    staging: str = f"{store.base_path}/.import-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    try:
+        manifest: dict[str, Any] = unpack(path, staging)
+        version: str | None = manifest["serving_version"]
+        serving_prefix: str = f"serving/{version}/"
+
+        for name in manifest["files"]:
+            if version is not None and name.startswith(serving_prefix):
+                continue
+            target: str = f"{store.base_path}/{name}"
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(f"{staging}/{name}", target)
+
+        if version is not None:
+            with store.serving_lock():
+                if not os.path.isdir(store.serving_version_path(version)):
+                    os.replace(
+                        f"{staging}/serving/{version}",
+                        store.serving_version_path(version),
+                    )
+                store.set_current_serving(version)
+
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return {
+        "files": len(manifest["files"]),
+        "bytes": sum(f["size"] for f in manifest["files"].values()),
+        "serving_version": version,
+        "elapsed_seconds": time.perf_counter() - started,
+    }
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.bundle", description=__doc__.split("\n\n")[1]
+    )
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("bundle", help="bundle file (.tar.gz)")
+    parser.add_argument("--data-store", default="./data_store")
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="export: also include the raw per-ticker data cache",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args: argparse.Namespace = parse_args(argv)
+    store: DataStore = DataStore(args.data_store)
+
+    if args.command == "export":
+        summary: dict[str, Any] = export_bundle(store, args.bundle, args.raw)
+        print(
+            f"Exported {summary['files']} files ({summary['bytes'] / 1e6:.1f} MB, "
+            f"{summary['bundle_bytes'] / 1e6:.1f} MB compressed) "
+            f"in {summary['elapsed_seconds']:.1f}s"
+        )
+        print(f"Serving snapshot: {summary['serving_version']}")
+        print(f"SHA-256: {summary['sha256']}")
+    else:
+        summary = import_bundle(store, args.bundle)
+        print(
+            f"Imported {summary['files']} files ({summary['bytes'] / 1e6:.1f} MB) "
+            f"in {summary['elapsed_seconds']:.1f}s"
+        )
+        print(f"Serving snapshot: {summary['serving_version']}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
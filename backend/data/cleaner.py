@@ -21,11 +21,21 @@ def clean_price_history(ph_df: pd.DataFrame) -> pd.DataFrame:
 
     Expected output columns:
     open, high, low, close, volume
+
+    Input that is already in this schema (numeric, sorted DatetimeIndex)
+    skips the relabelling and coercion steps and is returned unchanged
+    when it has no gaps.
     """
     if ph_df is None or ph_df.empty:
         return pd.DataFrame()
 
-    df = ph_df.copy()
+    if is_clean_price_history(ph_df):
+        if not ph_df.isna().to_numpy().any():
+            return ph_df
+        return ph_df.ffill().dropna(subset=["close"])
+
+    # Relabelling below only replaces the column index, so a shallow copy suffices
+    df = ph_df.copy(deep=False)
 
     if isinstance(df.columns, pd.MultiIndex):
         field_names: set[str] = {"open", "high", "low", "close", "adj close", "volume"}
@@ -49,7 +59,7 @@ def clean_price_history(ph_df: pd.DataFrame) -> pd.DataFrame:
 
     df = df.loc[:, ~df.columns.duplicated()]
 
-    required_cols: list[str] = ["open", "high", "low", "close", "volume"]
+    required_cols: list[str] = PRICE_COLUMNS
     missing: list[str] = [col for col in required_cols if col not in df.columns]
 
     if missing:
@@ -60,8 +70,7 @@ def clean_price_history(ph_df: pd.DataFrame) -> pd.DataFrame:
     df.index = pd.to_datetime(df.index)
     df = df.sort_index()
 
-    for col in required_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = coerce_numeric(df)
 
     df = df.ffill()
     df = df.dropna(subset=["close"])
@@ -69,6 +78,21 @@ def clean_price_history(ph_df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+PRICE_COLUMNS: list[str] = ["open", "high", "low", "close", "volume"]
+
+
+def is_clean_price_history(df: pd.DataFrame) -> bool:
+    """
+    Whether a frame already matches the cleaned price-history schema.
+    """
+    return (
+        list(df.columns) == PRICE_COLUMNS
+        and isinstance(df.index, pd.DatetimeIndex)
+        and df.index.is_monotonic_increasing
+        and is_numeric_frame(df)
+    )
+
+
 # -------------------------------
 # Helpers
 # -------------------------------
@@ -125,12 +149,12 @@ def clean_fundamentals(f_dict: dict) -> dict[str, Any]:
 
 
 # -------------------------------
-# Balance sheets
+# Statements
 # -------------------------------
 
-
-def clean_balance_sheet(bs_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+# Rows kept per statement category, in output order
+STATEMENT_ROWS: dict[str, list[str]] = {
+    "balance_sheet": [
         "stockholders_equity",
         "common_stock_equity",
         "total_assets",
@@ -142,16 +166,8 @@ def clean_balance_sheet(bs_df: pd.DataFrame) -> pd.DataFrame:
         "ordinary_shares_number",
         "treasury_shares_number",
         "share_issued",
-    ]
-    df = bs_df.copy()
-    df.index = df.index.str.lower().str.replace(" ", "_")
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    return df
-
-
-def clean_quarterly_balance_sheet(qbs_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+    ],
+    "quarterly_balance_sheet": [
         "totalassets",
         "totalliabilitiesnetminorityinterest",
         "commonstockequity",
@@ -168,40 +184,8 @@ def clean_quarterly_balance_sheet(qbs_df: pd.DataFrame) -> pd.DataFrame:
         "ordinarysharesnumber",
         "treasurysharesnumber",
         "shareissued",
-    ]
-    row_map: dict[str, str] = {
-        "totalassets": "total_assets",
-        "totalliabilitiesnetminorityinterest": "total_liabilities",
-        "commonstockequity": "common_stock_equity",
-        "stockholdersequity": "stockholders_equity",
-        "totaldebt": "total_debt",
-        "netdebt": "net_debt",
-        "cashandcashequivalents": "cash_and_cash_equivalents",
-        "cashcashequivalentsandshortterminvestments": "cash_cash_equivalents_and_short_term_investments",
-        "inventory": "inventory",
-        "accountsreceivable": "accounts_receivable",
-        "accountspayable": "accounts_payable",
-        "othercurrentassets": "other_current_assets",
-        "othercurrentliabilities": "other_current_liabilities",
-        "ordinarysharesnumber": "ordinary_shares_number",
-        "treasurysharesnumber": "treasury_shares_number",
-        "shareissued": "share_issued",
-    }
-    df = qbs_df.copy()
-    df.index = df.index.str.lower()
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    df.index = df.index.map(row_map)
-    return df
-
-
-# -------------------------------
-# Income statements
-# -------------------------------
-
-
-def clean_income_statement(is_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+    ],
+    "income_statement": [
         "total_revenue",
         "cost_of_revenue",
         "gross_profit",
@@ -212,16 +196,8 @@ def clean_income_statement(is_df: pd.DataFrame) -> pd.DataFrame:
         "net_income",
         "operating_expense",
         "research_and_development",
-    ]
-    df = is_df.copy()
-    df.index = df.index.str.lower().str.replace(" ", "_")
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    return df
-
-
-def clean_quarterly_income_statement(qis_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+    ],
+    "quarterly_income_statement": [
         "total_revenue",
         "cost_of_revenue",
         "gross_profit",
@@ -233,16 +209,8 @@ def clean_quarterly_income_statement(qis_df: pd.DataFrame) -> pd.DataFrame:
         "net_income",
         "research_and_development",
         "selling_general_and_administration",
-    ]
-    df = qis_df.copy()
-    df.index = df.index.str.lower().str.replace(" ", "_")
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    return df
-
-
-def clean_ttm_income_statement(ttmis_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+    ],
+    "ttm_income_statement": [
         "total_revenue",
         "cost_of_revenue",
         "gross_profit",
@@ -256,21 +224,8 @@ def clean_ttm_income_statement(ttmis_df: pd.DataFrame) -> pd.DataFrame:
         "research_and_development",
         "selling_general_and_administration",
         "reconciled_depreciation",
-    ]
-    df = ttmis_df.copy()
-    df.index = df.index.str.lower().str.replace(" ", "_")
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    return df
-
-
-# -------------------------------
-# Cash flow statements
-# -------------------------------
-
-
-def clean_cashflow(cf_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+    ],
+    "cashflow": [
         "operating_cash_flow",
         "free_cash_flow",
         "capital_expenditure",
@@ -280,16 +235,8 @@ def clean_cashflow(cf_df: pd.DataFrame) -> pd.DataFrame:
         "stock_based_compensation",
         "net_income_from_continuing_operations",
         "change_in_working_capital",
-    ]
-    df = cf_df.copy()
-    df.index = df.index.str.lower().str.replace(" ", "_")
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    return df
-
-
-def clean_quarterly_cashflow(qcf_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+    ],
+    "quarterly_cashflow": [
         "operating_cash_flow",
         "free_cash_flow",
         "capital_expenditure",
@@ -297,16 +244,8 @@ def clean_quarterly_cashflow(qcf_df: pd.DataFrame) -> pd.DataFrame:
         "stock_based_compensation",
         "net_income_from_continuing_operations",
         "change_in_working_capital",
-    ]
-    df = qcf_df.copy()
-    df.index = df.index.str.lower().str.replace(" ", "_")
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
-    return df
-
-
-def clean_ttm_cashflow(ttmcf_df: pd.DataFrame) -> pd.DataFrame:
-    important_rows: list[str] = [
+    ],
+    "ttm_cashflow": [
         "operating_cash_flow",
         "free_cash_flow",
         "capital_expenditure",
@@ -316,14 +255,178 @@ def clean_ttm_cashflow(ttmcf_df: pd.DataFrame) -> pd.DataFrame:
         "stock_based_compensation",
         "net_income_from_continuing_operations",
         "change_in_working_capital",
+    ],
+}
+
+# Categories whose labels are only lowercased (no spaces), then renamed
+COMPACT_LABELS: set[str] = {"quarterly_balance_sheet"}
+
+ROW_MAPS: dict[str, dict[str, str]] = {
+    "quarterly_balance_sheet": {
+        "totalassets": "total_assets",
+        "totalliabilitiesnetminorityinterest": "total_liabilities",
+        "commonstockequity": "common_stock_equity",
+        "stockholdersequity": "stockholders_equity",
+        "totaldebt": "total_debt",
+        "netdebt": "net_debt",
+        "cashandcashequivalents": "cash_and_cash_equivalents",
+        "cashcashequivalentsandshortterminvestments": "cash_cash_equivalents_and_short_term_investments",
+        "inventory": "inventory",
+        "accountsreceivable": "accounts_receivable",
+        "accountspayable": "accounts_payable",
+        "othercurrentassets": "other_current_assets",
+        "othercurrentliabilities": "other_current_liabilities",
+        "ordinarysharesnumber": "ordinary_shares_number",
+        "treasurysharesnumber": "treasury_shares_number",
+        "shareissued": "share_issued",
+    },
+}
+
+
+def normalize_labels(index: pd.Index, category: str) -> pd.Index:
+    """
+    Lowercases statement row labels (and snake-cases them unless compact).
+    """
+    labels: pd.Index = index.str.lower()
+    if category not in COMPACT_LABELS:
+        labels = labels.str.replace(" ", "_")
+    return labels
+
+
+def output_rows(category: str) -> list[str]:
+    rows: list[str] = STATEMENT_ROWS[category]
+    row_map: dict[str, str] | None = ROW_MAPS.get(category)
+    return rows if row_map is None else [row_map[r] for r in rows]
+
+
+def is_numeric_frame(df: pd.DataFrame) -> bool:
+    return all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes)
+
+
+def coerce_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts non-numeric columns with pd.to_numeric(errors="coerce").
+    Already-numeric frames are returned unchanged.
+    """
+    positions: list[int] = [
+        i
+        for i, dtype in enumerate(df.dtypes)
+        if not pd.api.types.is_numeric_dtype(dtype)
     ]
-    df = ttmcf_df.copy()
-    df.index = df.index.str.lower().str.replace(" ", "_")
-    df = df.reindex(important_rows)
-    df = df.apply(pd.to_numeric, errors="coerce")
+    if not positions:
+        return df
+
+    df = df.copy(deep=False)
+    for i in positions:
+        df.isetitem(i, pd.to_numeric(df.iloc[:, i], errors="coerce"))
     return df
 
 
+def clean_statement(df: pd.DataFrame, category: str) -> pd.DataFrame:
+    """
+    Selects a category's important rows (missing ones as NaN) and coerces
+    values to numbers. Frames that are already clean are returned as is;
+    otherwise only relabelled views and non-numeric columns are rebuilt.
+    """
+    rows: list[str] = output_rows(category)
+    if df.index.equals(pd.Index(rows)) and is_numeric_frame(df):
+        return df
+
+    df = df.set_axis(normalize_labels(df.index, category), axis=0)
+    df = coerce_numeric(df.reindex(STATEMENT_ROWS[category]))
+
+    if category in ROW_MAPS:
+        df.index = rows
+    return df
+
+
+def clean_statements(
+    category: str, frames: dict[str, pd.DataFrame]
+) -> dict[str, pd.DataFrame]:
+    """
+    Batch version of clean_statement for many tickers' statements of one
+    category. Frames are concatenated so labels are normalized and values
+    coerced once, then split back with each ticker's own columns.
+    None or empty frames are skipped.
+    """
+    frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return {}
+
+    rows: list[str] = output_rows(category)
+    tickers: list[str] = list(frames)
+
+    combined: pd.DataFrame = pd.concat(
+        [
+            df.set_axis(normalize_labels(df.index, category), axis=0)
+            for df in frames.values()
+        ],
+        keys=tickers,
+        sort=False,
+    )
+    combined = combined.reindex(
+        pd.MultiIndex.from_product([tickers, STATEMENT_ROWS[category]])
+    )
+    combined = coerce_numeric(combined)
+
+    n_rows: int = len(rows)
+    cleaned: dict[str, pd.DataFrame] = {}
+    for i, ticker in enumerate(tickers):
+        block: pd.DataFrame = combined.iloc[i * n_rows : (i + 1) * n_rows]
+        block = block.loc[:, frames[ticker].columns]
+        block.index = rows
+        cleaned[ticker] = block
+
+    return cleaned
+
+
+# -------------------------------
+# Balance sheets
+# -------------------------------
+
+
+def clean_balance_sheet(bs_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(bs_df, "balance_sheet")
+
+
+def clean_quarterly_balance_sheet(qbs_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(qbs_df, "quarterly_balance_sheet")
+
+
+# -------------------------------
+# Income statements
+# -------------------------------
+
+
+def clean_income_statement(is_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(is_df, "income_statement")
+
+
+def clean_quarterly_income_statement(qis_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(qis_df, "quarterly_income_statement")
+
+
+def clean_ttm_income_statement(ttmis_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(ttmis_df, "ttm_income_statement")
+
+
+# -------------------------------
+# Cash flow statements
+# -------------------------------
+
+
+def clean_cashflow(cf_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(cf_df, "cashflow")
+
+
+def clean_quarterly_cashflow(qcf_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(qcf_df, "quarterly_cashflow")
+
+
+def clean_ttm_cashflow(ttmcf_df: pd.DataFrame) -> pd.DataFrame:
+    return clean_statement(ttmcf_df, "ttm_cashflow")
+
+
 # -------------------------------
 # Metadata
 # -------------------------------
@@ -11,6 +11,7 @@ exclusively through Provider.
 """
 
 import random
+import threading
 import time
 from typing import Any
 
@@ -26,6 +27,7 @@ from backend.data.cleaner import (
     clean_quarterly_balance_sheet,
     clean_quarterly_cashflow,
     clean_quarterly_income_statement,
+    clean_statements,
     clean_ttm_cashflow,
     clean_ttm_income_statement,
 )
@@ -44,6 +46,13 @@ from backend.data.fetcher import (
 )
 from backend.data_store.storage import DataStore
 
+EMPTY_TTL_SECONDS: float = 7 * 24 * 60 * 60
+FAILURE_TTL_SECONDS: float = 6 * 60 * 60
+
+
+class EmptyDatasetError(RuntimeError):
+    """Raised when a fetch succeeds but returns no data."""
+
 
 class Provider:
     """
@@ -51,11 +60,27 @@ class Provider:
     """
 
     def __init__(
-        self, data_store: DataStore, max_retries: int = 3, base_delay: float = 1.0
+        self,
+        data_store: DataStore,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        empty_ttl: float = EMPTY_TTL_SECONDS,
+        failure_ttl: float = FAILURE_TTL_SECONDS,
+        refetch: set[str] | None = None,
+        refetch_pairs: set[tuple[str, str]] | None = None,
     ) -> None:
         self.store: DataStore = data_store
         self.max_retries: int = max_retries
         self.base_delay: float = base_delay
+        self.empty_ttl: float = empty_ttl
+        self.failure_ttl: float = failure_ttl
+
+        # Categories to fetch fresh once per ticker, bypassing the disk cache
+        self.refetch: set[str] = set(refetch or ())
+        # Single (ticker, category) datasets to fetch fresh, e.g. from a refresh plan
+        self.refetch_pairs: set[tuple[str, str]] = set(refetch_pairs or ())
+        self.refetched: set[tuple[str, str]] = set()
+        self.refetch_lock: threading.Lock = threading.Lock()
 
     # -------------------------------
     # Internal helpers
@@ -69,12 +94,12 @@ class Provider:
                 raw = fetch(ticker)
 
                 if raw is None:
-                    raise RuntimeError(
+                    raise EmptyDatasetError(
                         f"{category} for {ticker} returned empty DataFrame"
                     )
 
                 if isinstance(raw, pd.DataFrame) and raw.empty:
-                    raise RuntimeError(
+                    raise EmptyDatasetError(
                         f"{category} for {ticker} returned empty DataFrame"
                     )
 
@@ -83,7 +108,8 @@ class Provider:
             except Exception as e:
                 last_error: Exception = e
 
-                if attempt == self.max_retries:
+                # An empty dataset is a definite answer, retrying will not change it
+                if isinstance(e, EmptyDatasetError) or attempt == self.max_retries:
                     break
 
                 delay = self.base_delay * (2 ** (attempt - 1))
@@ -96,47 +122,117 @@ class Provider:
 
                 time.sleep(delay)
 
+        self.mark_negative(ticker, category, last_error)
+
         raise RuntimeError(
             f"Failed to fetch {category} for {ticker} "
-            f"after {self.max_retries} attempts: {last_error}"
+            f"after {attempt} attempt(s): {last_error}"
         )
 
-    def load_fetch_df(self, ticker, category, fetch, clean) -> pd.DataFrame | Any:
+    def mark_negative(self, ticker: str, category, error: Exception | None) -> None:
         """
-        Loads/fetches a Dataframe Dataset with caching.
+        Persists a negative-cache marker so later runs skip the fetch until it expires.
+        """
+        if isinstance(error, EmptyDatasetError):
+            kind, ttl = "empty", self.empty_ttl
+        else:
+            kind, ttl = "error", self.failure_ttl
+
+        try:
+            self.store.save_negative(ticker, category, kind, str(error), ttl)
+        except Exception as e:
+            print(f"Could not save negative cache for {category} of {ticker}: {e}")
+
+    def should_refetch(self, ticker: str, category) -> bool:
+        """
+        True the first time a refetch category or pair is requested for a ticker.
+        """
+        if (
+            category not in self.refetch
+            and (ticker, category) not in self.refetch_pairs
+        ):
+            return False
+        with self.refetch_lock:
+            if (ticker, category) in self.refetched:
+                return False
+            self.refetched.add((ticker, category))
+            return True
+
+    def check_negative(self, ticker: str, category) -> None:
         """
+        Raises immediately if the dataset is known to be empty or failing.
+        """
+        marker: dict[str, Any] | None = self.store.load_negative(ticker, category)
+        if marker is not None:
+            raise RuntimeError(
+                f"{category} for {ticker} is negatively cached "
+                f"({marker['kind']}) until {marker['expires_at']}"
+            )
+
+    def fetch_raw_df(
+        self, ticker: str, category, fetch
+    ) -> tuple[pd.DataFrame | None, Any]:
+        """
+        Cached frame and freshly fetched raw data of a DataFrame dataset.
+        Raw is None when the cached frame should be used as it is.
+        """
+        refetch: bool = self.should_refetch(ticker, category)
         cache = self.store.load_df(ticker, category)
-        if cache is not None:
-            return cache
+        if cache is not None and not refetch:
+            return cache, None
+
+        if not refetch:
+            self.check_negative(ticker, category)
 
         try:
             raw = self.fetch_with_retry(ticker, category, fetch)
         except Exception as e:
+            if cache is not None:
+                print(f"Refetch of {category} for {ticker} failed, using cache: {e}")
+                return cache, None
             raise RuntimeError(f"Failed to fetch {category} for {ticker}: {e}")
 
         if raw is None:
             raise RuntimeError(f"{category} for {ticker} returned None")
 
-        cleaned = clean(raw)
+        return cache, raw
 
+    def save_cleaned_df(self, ticker: str, category, cleaned: pd.DataFrame) -> None:
         try:
             self.store.save_df(ticker, category, cleaned)
         except Exception as e:
             print(f"Could not save {category} for {ticker}. Error: {e}")
 
+    def load_fetch_df(self, ticker, category, fetch, clean) -> pd.DataFrame | Any:
+        """
+        Loads/fetches a Dataframe Dataset with caching.
+        """
+        cache, raw = self.fetch_raw_df(ticker, category, fetch)
+        if raw is None:
+            return cache
+
+        cleaned = clean(raw)
+        self.save_cleaned_df(ticker, category, cleaned)
         return cleaned
 
     def load_fetch_json(self, ticker, category, fetch, clean) -> pd.DataFrame | Any:
         """
         Loads/fetches a JSON Dataset with caching.
         """
+        refetch: bool = self.should_refetch(ticker, category)
         cache = self.store.load_json(ticker, category)
-        if cache is not None:
+        if cache is not None and not refetch:
             return cache
 
+        if not refetch:
+            self.check_negative(ticker, category)
+
         try:
             raw = raw = self.fetch_with_retry(ticker, category, fetch)
         except Exception as e:
+            if cache is not None:
+                print(f"Refetch of {category} for {ticker} failed, using cache: {e}")
+                return cache
             raise RuntimeError(f"Failed to fetch {category} for {ticker}: {e}")
 
         if raw is None:
@@ -221,6 +317,47 @@ class Provider:
     def get_metadata(self, ticker: str) -> pd.DataFrame | Any:
         return self.load_fetch_json(ticker, "metadata", fetch_metadata, clean_metadata)
 
+    def statement_fetcher(self, category: str):
+        return {
+            "balance_sheet": fetch_balance_sheet,
+            "quarterly_balance_sheet": fetch_quarterly_balance_sheet,
+            "income_statement": fetch_income_statement,
+            "quarterly_income_statement": fetch_quarterly_income_statement,
+            "ttm_income_statement": fetch_ttm_income_statement,
+            "cashflow": fetch_cashflow,
+            "quarterly_cashflow": fetch_quarterly_cashflow,
+            "ttm_cashflow": fetch_ttm_cashflow,
+        }[category]
+
+    def get_statements(
+        self, category: str, tickers: list[str]
+    ) -> dict[str, pd.DataFrame | Exception]:
+        """
+        One statement category for many tickers. Cached frames are used as
+        they are; fetched ones are cleaned together in one batch and cached
+        per ticker. Failures are returned per ticker instead of raised.
+        """
+        fetch = self.statement_fetcher(category)
+        results: dict[str, pd.DataFrame | Exception] = {}
+        raw: dict[str, pd.DataFrame] = {}
+
+        for ticker in tickers:
+            try:
+                cache, frame = self.fetch_raw_df(ticker, category, fetch)
+            except Exception as e:
+                results[ticker] = e
+                continue
+            if frame is None:
+                results[ticker] = cache
+            else:
+                raw[ticker] = frame
+
+        for ticker, cleaned in clean_statements(category, raw).items():
+            self.save_cleaned_df(ticker, category, cleaned)
+            results[ticker] = cleaned
+
+        return {t: results[t] for t in tickers}
+
     def get_all_data(self, ticker: str) -> dict[str, Any]:
         data: dict[str, Any] = {
             "price_history": self.get_price_history(ticker),
@@ -0,0 +1,129 @@
+"""
+refresh_planner.py
+
+Decides which cached financial statements could have new data. Statements
+change at most once per reporting period, so instead of refetching every
+statement category, a refresh fetches a (ticker, category) pair only when
+the next period after its latest cached column has ended and had time to
+be reported.
+"""
+
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from backend.data_store.storage import DataStore
+
+ANNUAL_DAYS: int = 365
+QUARTERLY_DAYS: int = 91
+
+# Expected days between consecutive statement periods
+CADENCE_DAYS: dict[str, int] = {
+    "balance_sheet": ANNUAL_DAYS,
+    "income_statement": ANNUAL_DAYS,
+    "cashflow": ANNUAL_DAYS,
+    "quarterly_balance_sheet": QUARTERLY_DAYS,
+    "quarterly_income_statement": QUARTERLY_DAYS,
+    "quarterly_cashflow": QUARTERLY_DAYS,
+    "ttm_income_statement": QUARTERLY_DAYS,
+    "ttm_cashflow": QUARTERLY_DAYS,
+}
+
+STATEMENT_CATEGORIES: tuple[str, ...] = tuple(CADENCE_DAYS)
+
+# Earliest a period is usually reported after it ends
+REPORTING_LAG_DAYS: int = 20
+
+# Once a new period is due, check at most this often until it shows up
+RECHECK_DAYS: int = 7
+
+
+class RefreshPlanner:
+    """
+    Plans statement refetches from the cached data alone, without any
+    network access.
+    """
+
+    def __init__(
+        self,
+        store: DataStore,
+        reporting_lag_days: int = REPORTING_LAG_DAYS,
+        recheck_days: int = RECHECK_DAYS,
+    ) -> None:
+        self.store: DataStore = store
+        self.reporting_lag: timedelta = timedelta(days=reporting_lag_days)
+        self.recheck_seconds: float = recheck_days * 24 * 60 * 60
+
+    @staticmethod
+    def latest_period(columns: list[str]) -> pd.Timestamp | None:
+        """
+        Most recent period among a statement's column names, or None if
+        none of them is a date.
+        """
+        periods: pd.DatetimeIndex = pd.to_datetime(
+            pd.Index(columns), errors="coerce", format="mixed"
+        ).dropna()
+        return periods.max() if len(periods) else None
+
+    def decide(self, ticker: str, category: str, now: datetime) -> str:
+        """
+        Reason a pair should ("missing", "undated", "due") or should not
+        ("negative", "current", "checked") be fetched.
+        """
+        try:
+            columns: list[str] | None = self.store.df_columns(ticker, category)
+        except Exception:
+            columns = None
+
+        if columns is None:
+            if self.store.load_negative(ticker, category) is not None:
+                return "negative"
+            return "missing"
+
+        latest: pd.Timestamp | None = self.latest_period(columns)
+        if latest is not None:
+            next_period: pd.Timestamp = latest + timedelta(days=CADENCE_DAYS[category])
+            if now < next_period + self.reporting_lag:
+                return "current"
+
+        checked_at: float | None = self.store.modified_at(ticker, category, "parquet")
+        if (
+            checked_at is not None
+            and now.timestamp() - checked_at < self.recheck_seconds
+        ):
+            return "checked"
+
+        return "undated" if latest is None else "due"
+
+    def plan(
+        self,
+        tickers: list[str],
+        categories: list[str] | tuple[str, ...] = STATEMENT_CATEGORIES,
+        now: datetime | None = None,
+    ) -> tuple[list[tuple[str, str]], dict[str, int]]:
+        """
+        (ticker, category) pairs that could have new data, and the number of
+        pairs per decision. Non-statement categories are not planned.
+        """
+        now = now or datetime.now()
+        started: float = time.perf_counter()
+
+        fetch: list[tuple[str, str]] = []
+        reasons: Counter = Counter()
+
+        for ticker in tickers:
+            for category in categories:
+                if category not in CADENCE_DAYS:
+                    continue
+                reason: str = self.decide(ticker, category, now)
+                reasons[reason] += 1
+                if reason in ("missing", "undated", "due"):
+                    fetch.append((ticker, category))
+
+        print(
+            f"Planned {len(fetch)}/{sum(reasons.values())} statement fetches "
+            f"in {time.perf_counter() - started:.2f}s: {dict(reasons)}"
+        )
+        return fetch, dict(reasons)
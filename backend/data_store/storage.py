@@ -5,11 +5,18 @@ File-based data cache for fetched and cleaned financial data.
 Stores per-ticker datasets to avoid repeated API calls.
 """
 
+import fcntl
+import hashlib
 import json
 import os
-from typing import Any
+import shutil
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterator
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from pandas import DataFrame
 
 
@@ -48,6 +55,26 @@ class DataStore:
         df: DataFrame = pd.read_parquet(file_path)
         return df
 
+    def df_columns(self, ticker, category: str) -> None | list[str]:
+        """
+        Column names of a cached dataframe, read from the parquet footer
+        without loading any data.
+        """
+        file_path: str = self.file_path(ticker, category, "parquet")
+        if not os.path.exists(file_path):
+            return None
+        names: list[str] = pq.read_schema(file_path).names
+        return [n for n in names if not n.startswith("__index_level_")]
+
+    def modified_at(self, ticker, category: str, extension: str) -> None | float:
+        """
+        Unix time a cached dataset was last written.
+        """
+        try:
+            return os.path.getmtime(self.file_path(ticker, category, extension))
+        except FileNotFoundError:
+            return None
+
     # =========================
     # JSON STORAGE
     # =========================
@@ -64,3 +91,322 @@ class DataStore:
             return None
         with open(file_path, "r") as f:
             return json.load(f)
+
+    # =========================
+    # SNAPSHOTS
+    # =========================
+
+    def snapshot_path(self, name: str) -> str:
+        return f"{self.base_path}/snapshots/{name}.json"
+
+    def save_snapshot(self, name: str, data: dict) -> None:
+        """
+        Writes a universe-level snapshot atomically (write then rename).
+        """
+        file_path: str = self.snapshot_path(name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(f"{file_path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{file_path}.tmp", file_path)
+
+    def load_snapshot(self, name: str) -> None | Any:
+        file_path: str = self.snapshot_path(name)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "r") as f:
+            return json.load(f)
+
+    def snapshot_digest(self, name: str) -> str | None:
+        """
+        SHA-1 of a snapshot file's contents, None when it does not exist.
+        """
+        try:
+            with open(self.snapshot_path(name), "rb") as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    # =========================
+    # NEGATIVE CACHE
+    # =========================
+
+    def negative_path(self, ticker, category: str) -> str:
+        return self.file_path(ticker, category, "missing.json")
+
+    def save_negative(
+        self, ticker, category: str, kind: str, reason: str, ttl_seconds: float
+    ) -> None:
+        """
+        Records that a dataset is known to be empty or failing,
+        valid until the marker expires.
+        """
+        self.ensure_dir(ticker)
+        now: datetime = datetime.now(timezone.utc)
+        marker: dict[str, Any] = {
+            "kind": kind,
+            "reason": reason,
+            "created_at": now.isoformat(),
+            "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat(),
+        }
+        with open(self.negative_path(ticker, category), "w") as f:
+            json.dump(marker, f, indent=4)
+
+    def load_negative(self, ticker, category: str) -> None | dict[str, Any]:
+        """
+        Returns the negative-cache marker if one exists and has not expired.
+        Expired or unreadable markers are removed.
+        """
+        file_path: str = self.negative_path(ticker, category)
+        if not os.path.exists(file_path):
+            return None
+
+        try:
+            with open(file_path, "r") as f:
+                marker: dict[str, Any] = json.load(f)
+            expires_at: datetime = datetime.fromisoformat(marker["expires_at"])
+        except (OSError, ValueError, KeyError):
+            self.clear_negative(ticker, category)
+            return None
+
+        if expires_at <= datetime.now(timezone.utc):
+            self.clear_negative(ticker, category)
+            return None
+
+        return marker
+
+    def clear_negative(self, ticker, category: str) -> None:
+        try:
+            os.remove(self.negative_path(ticker, category))
+        except FileNotFoundError:
+            pass
+
+    # =========================
+    # FACTOR HISTORY
+    # =========================
+
+    def history_path(self) -> str:
+        return f"{self.base_path}/factor_history"
+
+    def history_partition(self, as_of: date) -> str:
+        return f"{self.history_path()}/as_of={as_of.isoformat()}"
+
+    def save_factor_snapshot(self, as_of: date, df: pd.DataFrame) -> None:
+        """
+        Writes one factor-score snapshot (a ticker column plus one column
+        per factor) into its as-of date partition, replacing any earlier one.
+        """
+        directory_path: str = self.history_partition(as_of)
+        os.makedirs(directory_path, exist_ok=True)
+        df.to_parquet(f"{directory_path}/scores.parquet", index=False)
+
+    def factor_history_dates(self) -> list[date]:
+        """
+        Sorted as-of dates that have a stored snapshot.
+        """
+        if not os.path.isdir(self.history_path()):
+            return []
+
+        dates: list[date] = []
+        for name in os.listdir(self.history_path()):
+            if not name.startswith("as_of="):
+                continue
+            try:
+                dates.append(date.fromisoformat(name[len("as_of=") :]))
+            except ValueError:
+                continue
+
+        return sorted(dates)
+
+    def load_factor_history(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        tickers: list[str] | None = None,
+        factors: list[str] | None = None,
+    ) -> DataFrame:
+        """
+        Reads only the partitions in [start, end] and only the requested
+        columns and tickers. Returns one row per (as_of, ticker).
+        """
+        selected: list[date] = [
+            d
+            for d in self.factor_history_dates()
+            if (start is None or d >= start) and (end is None or d <= end)
+        ]
+
+        columns: list[str] | None = None if factors is None else ["ticker", *factors]
+        filters: list | None = None if tickers is None else [("ticker", "in", tickers)]
+
+        frames: list[DataFrame] = []
+        for d in selected:
+            df: DataFrame = pd.read_parquet(
+                f"{self.history_partition(d)}/scores.parquet",
+                columns=columns,
+                filters=filters,
+            )
+            df.insert(0, "as_of", pd.Timestamp(d))
+            frames.append(df)
+
+        if not frames:
+            return pd.DataFrame(columns=["as_of", "ticker", *(factors or [])])
+
+        return pd.concat(frames, ignore_index=True)
+
+    # =========================
+    # SERVING SNAPSHOTS
+    # =========================
+
+    def serving_path(self) -> str:
+        return f"{self.base_path}/serving"
+
+    def serving_version_path(self, version: str) -> str:
+        return f"{self.serving_path()}/{version}"
+
+    @contextmanager
+    def serving_lock(self, blocking: bool = True) -> Iterator[bool]:
+        """
+        Cross-process lock for building serving snapshots.
+        Yields whether the lock was acquired.
+        """
+        os.makedirs(self.serving_path(), exist_ok=True)
+        with open(f"{self.serving_path()}/build.lock", "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def save_serving_snapshot(
+        self,
+        version: str,
+        arrays: dict[str, np.ndarray],
+        meta: dict[str, Any],
+        keep: int = 2,
+        documents: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Writes arrays as .npy files plus meta.json (and any extra JSON
+        documents) into a version directory, then points CURRENT at it.
+        Both steps are atomic renames, so readers only ever see complete
+        snapshots.
+        """
+        target: str = self.serving_version_path(version)
+
+        if not os.path.isdir(target):
+            tmp: str = f"{target}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            for name, array in arrays.items():
+                np.save(f"{tmp}/{name}.npy", np.ascontiguousarray(array))
+            with open(f"{tmp}/meta.json", "w") as f:
+                json.dump(meta, f)
+            for name, document in (documents or {}).items():
+                with open(f"{tmp}/{name}.json", "w") as f:
+                    json.dump(document, f)
+            try:
+                os.replace(tmp, target)
+            except OSError:
+                # Another process published the same version first
+                shutil.rmtree(tmp, ignore_errors=True)
+
+        self.set_current_serving(version, keep)
+
+    def set_current_serving(self, version: str, keep: int = 2) -> None:
+        """
+        Atomically points CURRENT at an existing version directory and
+        removes older versions beyond keep.
+        """
+        pointer: str = f"{self.serving_path()}/CURRENT"
+        with open(f"{pointer}.tmp-{os.getpid()}", "w") as f:
+            f.write(version)
+        os.replace(f"{pointer}.tmp-{os.getpid()}", pointer)
+
+        versions: list[str] = sorted(
+            (
+                name
+                for name in os.listdir(self.serving_path())
+                if os.path.isdir(self.serving_version_path(name)) and "." not in name
+            ),
+            key=lambda name: os.path.getmtime(self.serving_version_path(name)),
+        )
+        for name in versions[:-keep]:
+            if name != version:
+                shutil.rmtree(self.serving_version_path(name), ignore_errors=True)
+
+    def current_serving_version(self) -> str | None:
+        try:
+            with open(f"{self.serving_path()}/CURRENT", "r") as f:
+                version: str = f.read().strip()
+        except FileNotFoundError:
+            return None
+
+        return version if os.path.isdir(self.serving_version_path(version)) else None
+
+    def load_serving_snapshot(
+        self, version: str
+    ) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        """
+        Memory-maps every array of a serving snapshot read-only.
+        """
+        directory_path: str = self.serving_version_path(version)
+        with open(f"{directory_path}/meta.json", "r") as f:
+            meta: dict[str, Any] = json.load(f)
+
+        arrays: dict[str, np.ndarray] = {
+            name[: -len(".npy")]: np.load(f"{directory_path}/{name}", mmap_mode="r")
+            for name in os.listdir(directory_path)
+            if name.endswith(".npy")
+        }
+        return arrays, meta
+
+    def load_serving_document(self, version: str, name: str) -> Any:
+        """
+        One extra JSON document of a serving snapshot.
+        """
+        with open(f"{self.serving_version_path(version)}/{name}.json", "r") as f:
+            return json.load(f)
+
+    # =========================
+    # CHECKPOINTS
+    # =========================
+
+    def checkpoint_path(self, job: str) -> str:
+        return f"{self.base_path}/checkpoints/{job}.jsonl"
+
+    def append_checkpoint(self, job: str, record: dict[str, Any]) -> None:
+        """
+        Appends one record to a job's checkpoint log and flushes it.
+        """
+        file_path: str = self.checkpoint_path(job)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+    def load_checkpoint(self, job: str) -> list[dict[str, Any]]:
+        """
+        Records of a job's checkpoint log. A truncated last line (from an
+        interrupted write) is ignored.
+        """
+        file_path: str = self.checkpoint_path(job)
+        if not os.path.exists(file_path):
+            return []
+
+        records: list[dict[str, Any]] = []
+        with open(file_path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def clear_checkpoint(self, job: str) -> None:
+        try:
+            os.remove(self.checkpoint_path(job))
+        except FileNotFoundError:
+            pass
@@ -5,254 +5,384 @@ Computes cross-sectional factor scores for a stock universe.
 Implements multi-signal factors with winsorization and sector-neutral z-scoring.
 """
 
+import hashlib
+import json
+from datetime import date, datetime, timezone
 from typing import Any
 
 import numpy as np
 import pandas as pd
-from pandas import Series
 
 from backend.data.universe import load_sp500_universe
+from backend.data_store.storage import DataStore
+from backend.factors.normalizer import NormalizedSignals, SectorNormalizer
+from backend.factors.registry import DEFAULT_REGISTRY, FactorPlan, FactorRegistry
 from backend.metrics.metric_builder import MetricBuilder
 
 
 class FactorCalculator:
-    def __init__(self, metric_builder: MetricBuilder) -> None:
+    def __init__(
+        self,
+        metric_builder: MetricBuilder,
+        metrics: dict[str, dict[str, Any] | None] | None = None,
+        registry: FactorRegistry = DEFAULT_REGISTRY,
+        force_refresh: bool = False,
+    ) -> None:
         self.metric_builder: MetricBuilder = metric_builder
+        self.plan: FactorPlan = registry.compile()
+        self.score_cache: dict[str, dict] | None = None
+        self.score_cache_version: str | None = None
+
+        if metrics is None:
+            self.load_metrics(force_refresh)
+        else:
+            self.set_metrics(metrics)
+
+    # -------------------------------
+    # Metrics
+    # -------------------------------
+
+    def load_metrics(self, force_refresh: bool = False) -> None:
+        """
+        Loads (or rebuilds) derived metrics for the full universe.
+        """
         raw_universe: list[str] = [t for t in load_sp500_universe()]
-        self.metrics: dict[str, dict[str, Any] | None] = (
-            self.metric_builder.load_universe_metrics(raw_universe)
+        metrics: dict[str, dict[str, Any] | None] = (
+            self.metric_builder.load_universe_metrics(raw_universe, force_refresh)
         )
+        self.set_metrics(metrics, raw_universe)
+
+        try:
+            self.metric_builder.save_universe_snapshot(metrics, raw_universe)
+        except Exception as e:
+            print(f"Could not save universe metrics snapshot: {e}")
+
+    def set_metrics(
+        self,
+        metrics: dict[str, dict[str, Any] | None],
+        universe: list[str] | None = None,
+    ) -> None:
+        """
+        Installs a new metrics table and invalidates everything derived from it.
+        """
+        if universe is None:
+            universe = list(metrics)
+
+        self.metrics: dict[str, dict[str, Any] | None] = metrics
         self.universe: list[str] = [
-            t for t in raw_universe if self.metrics.get(t) is not None
+            t for t in universe if self.metrics.get(t) is not None
         ]
         self.sector_map: dict[str, str] = {
             t: self.metrics[t]["sector"]
             for t in self.universe
             if self.metrics[t].get("sector") is not None
         }
+        self.row_index: dict[str, int] = {t: i for i, t in enumerate(self.universe)}
+        self.normalizer: SectorNormalizer = SectorNormalizer(
+            self.universe, self.sector_map
+        )
+        self.signals: NormalizedSignals | None = None
+        self.factors: np.ndarray | None = None
+        self.metrics_version: str = self.compute_version()
 
-    def winsorize(self, raw_scores: dict, limit: float = 3.0) -> dict:
+    def compute_version(self) -> str:
         """
-        Clips extreme values using mean ± (limit × std).
+        Content hash of the universe metrics, used to key derived caches.
         """
-        s: Series[Any] = pd.Series(raw_scores, dtype=float)
-        valid: Series[Any] = s.dropna()
+        payload: str = json.dumps(
+            [self.metrics[t] for t in self.universe], sort_keys=True, default=str
+        )
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
 
-        if len(valid) < 2:
-            return raw_scores
+    def refresh_ticker(self, ticker: str) -> None:
+        """
+        Rebuilds one ticker's metrics and applies them incrementally.
+        """
+        metrics: dict[str, Any] = self.metric_builder.load_or_build_metrics(
+            ticker, force_refresh=True
+        )
+        self.update_ticker_metrics(ticker, metrics)
 
-        mean: float = valid.mean()
-        std: float = valid.std()
+    def update_ticker_metrics(
+        self, ticker: str, metrics: dict[str, Any] | None
+    ) -> None:
+        """
+        Replaces a single ticker's metrics. Only the affected sector (plus any
+        global-fallback rows) is re-scored; universe or sector-set changes
+        fall back to a full rebuild.
+        """
+        sector: str | None = None if metrics is None else metrics.get("sector")
+        row: int | None = self.row_index.get(ticker)
+        known_sector: bool = sector is None or sector in self.normalizer.sector_codes
+
+        if metrics is None or row is None or not known_sector:
+            self.metrics[ticker] = metrics
+            universe: list[str] = self.universe + (
+                [] if ticker in self.row_index else [ticker]
+            )
+            self.set_metrics(self.metrics, universe)
+            return
+
+        self.metrics[ticker] = metrics
+        if sector is None:
+            self.sector_map.pop(ticker, None)
+        else:
+            self.sector_map[ticker] = sector
+
+        if self.factors is not None:
+            values: np.ndarray = self.plan.raw_matrix({ticker: metrics}, [ticker])[0]
+            rows: np.ndarray = self.signals.update_row(
+                row, values, self.normalizer.code_for(sector)
+            )
+            self.factors[rows] = self.plan.combine(self.signals.z[rows])
+        else:
+            self.normalizer.codes[row] = self.normalizer.code_for(sector)
+
+        payload: str = json.dumps(metrics, sort_keys=True, default=str)
+        self.metrics_version = hashlib.sha1(
+            f"{self.metrics_version}:{ticker}:{payload}".encode()
+        ).hexdigest()[:16]
+
+    # -------------------------------
+    # Normalization
+    # -------------------------------
+
+    def to_vector(self, raw_scores: dict) -> np.ndarray:
+        """
+        Aligns a {ticker: value} dict to the universe as a float array (NaN = missing).
+        """
+        return np.array(
+            [
+                np.nan if raw_scores.get(t) is None else raw_scores.get(t)
+                for t in self.universe
+            ],
+            dtype=float,
+        )
 
-        upper: float = mean + limit * std
-        lower: float = mean - limit * std
+    def to_dict(self, values: np.ndarray) -> dict:
+        """
+        Converts a universe-aligned array back to {ticker: value}, NaN as None.
+        """
+        return {
+            t: (None if np.isnan(v) else float(v))
+            for t, v in zip(self.universe, values)
+        }
 
-        clipped: Series[Any] = s.clip(lower, upper)
-        return clipped.to_dict()
+    def winsorize(self, raw_scores: dict, limit: float = 3.0) -> dict:
+        """
+        Clips extreme values using mean ± (limit × std).
+        """
+        matrix: np.ndarray = self.to_vector(raw_scores)[:, None]
+        return self.to_dict(self.normalizer.winsorize(matrix, limit)[:, 0])
 
     def z_score_calculator(self, raw_scores: dict) -> dict:
         """
         Computes sector neutral Z-scores with global Z-score fallback.
         """
-        result: dict = {}
-        sector_groups: dict = {}
+        matrix: np.ndarray = self.to_vector(raw_scores)[:, None]
+        return self.to_dict(self.normalizer.z_score(matrix)[:, 0])
 
-        # Group tickers by sector
-        for t in self.universe:
-            sector: str | None = self.sector_map.get(t)
-            if sector is None:
-                continue
-            sector_groups.setdefault(sector, []).append(t)
+    def factor_matrix(self) -> np.ndarray:
+        """
+        Tickers × factors score array. Every distinct signal in the plan is
+        winsorized and sector z-scored once, in a single vectorized pass.
+        """
+        if self.factors is None:
+            raw: np.ndarray = self.plan.raw_matrix(self.metrics, self.universe)
+            self.signals = NormalizedSignals(self.normalizer, raw)
+            self.factors = self.plan.combine(self.signals.z)
 
-        # Sector-level z-scoring
-        for sector, tickers in sector_groups.items():
-            values: dict = {t: raw_scores.get(t) for t in tickers}
+        return self.factors
 
-            clean_vals: dict = {t: v for t, v in values.items() if v is not None}
+    def signal_matrices(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Winsorized and z-scored tickers × signals arrays behind factor_matrix().
+        """
+        self.factor_matrix()
+        return self.signals.winsorized, self.signals.z
 
-            if len(clean_vals) >= 2:
-                mean: np.floating[Any] = np.mean(list(clean_vals.values()))
-                std: np.floating[Any] = np.std(list(clean_vals.values()))
-                if std > 0:
-                    for t in tickers:
-                        v = values.get(t)
-                        result[t] = (v - mean) / std if v is not None else None
-                    continue
+    def dense_factors(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Zero-filled copy of factor_matrix() and its present-value mask.
+        """
+        factors: np.ndarray = self.factor_matrix()
+        mask: np.ndarray = ~np.isnan(factors)
+        return np.where(mask, factors, 0.0), mask
 
-            # If sector normalization fails, use global fallback
-            for t in tickers:
-                result[t] = None
+    def sector_index(self) -> tuple[list[str], np.ndarray]:
+        """
+        Sorted sector names and each ticker's sector code (-1 = no sector).
+        """
+        sectors: list[str] = sorted(
+            {self.sector_map[t] for t in self.universe if t in self.sector_map}
+        )
+        codes: dict[str, int] = {s: i for i, s in enumerate(sectors)}
+        return sectors, np.array(
+            [codes.get(self.sector_map.get(t), -1) for t in self.universe],
+            dtype=np.int64,
+        )
 
-        # Global fallback z-scoring
-        global_s: Series[float] = pd.Series(raw_scores, dtype=float)
-        global_valid: Series[float] = global_s.dropna()
+    def market_caps(self) -> np.ndarray:
+        """
+        Market capitalization per ticker, NaN where missing.
+        """
+        return np.array(
+            [
+                (
+                    np.nan
+                    if self.metrics[t].get("market_cap") is None
+                    else self.metrics[t]["market_cap"]
+                )
+                for t in self.universe
+            ],
+            dtype=float,
+        )
 
-        if len(global_valid) >= 2:
-            global_mean: float = global_valid.mean()
-            global_std: float = global_valid.std()
-            global_z = (global_valid - global_mean) / global_std
+    @property
+    def factor_names(self) -> list[str]:
+        return self.plan.factor_names
 
-            for t in self.universe:
-                if result.get(t) is None:
-                    v = raw_scores.get(t)
-                    result[t] = global_z[t] if t in global_z else None
+    @property
+    def signal_names(self) -> list[str]:
+        return self.plan.signal_names
 
-        return result
+    def factor_score(self, name: str) -> dict:
+        """
+        Scores of a single registered factor as {ticker: score}.
+        """
+        column: int = self.plan.factor_names.index(name)
+        return self.to_dict(self.factor_matrix()[:, column])
+
+    # -------------------------------
+    # Factors
+    # -------------------------------
 
     def value_score_calculator(self) -> dict:
         """
         Value factor Z-score calculation using multiple valuation signals.
         """
-        tickers: list = self.universe
-
-        bm: dict = {t: self.metrics[t].get("book_to_market") for t in tickers}
-        ep: dict = {t: self.metrics[t].get("earnings_to_price") for t in tickers}
-        cp: dict = {t: self.metrics[t].get("cashflow_to_price") for t in tickers}
-        sp: dict = {t: self.metrics[t].get("sales_to_price") for t in tickers}
-
-        bm = self.winsorize(bm)
-        ep = self.winsorize(ep)
-        cp = self.winsorize(cp)
-        sp = self.winsorize(sp)
-
-        z_bm: dict = self.z_score_calculator(bm)
-        z_ep: dict = self.z_score_calculator(ep)
-        z_cp: dict = self.z_score_calculator(cp)
-        z_sp: dict = self.z_score_calculator(sp)
-
-        scores: dict = {}
-
-        for t in tickers:
-            vals: list = [z_bm[t], z_ep[t], z_cp[t], z_sp[t]]
-            vals: list = [v for v in vals if v is not None]
-
-            scores[t] = np.mean(vals) if vals else None
-
-        return scores
+        return self.factor_score("value")
 
     def size_score_calculator(self) -> dict:
         """
         Size factor Z-score calculation using inverse of log market capitalization.
         """
-        tickers: list = self.universe
-
-        mc: dict = {t: self.metrics[t].get("market_cap") for t in tickers}
-
-        mc_rev: dict = {}
-
-        for t, m in mc.items():
-            if m is None or m <= 0:
-                mc_rev[t] = None
-            else:
-                mc_rev[t] = -np.log(m)
-
-        mc_rev = self.winsorize(mc_rev)
-
-        return self.z_score_calculator(mc_rev)
+        return self.factor_score("size")
 
     def momentum_score_calculator(self) -> dict:
         """
         Momentum factor Z-score calculation using momentum of different time frames.
         """
-        tickers: list = self.universe
-
-        m12: dict = {t: self.metrics[t].get("momentum_12_1") for t in tickers}
-        m6: dict = {t: self.metrics[t].get("momentum_6_1") for t in tickers}
-        m3: dict = {t: self.metrics[t].get("momentum_3_1") for t in tickers}
-
-        m12 = self.winsorize(m12)
-        m6 = self.winsorize(m6)
-        m3 = self.winsorize(m3)
-
-        z_12: dict = self.z_score_calculator(m12)
-        z_6: dict = self.z_score_calculator(m6)
-        z_3: dict = self.z_score_calculator(m3)
-
-        scores: dict = {}
-
-        for t in tickers:
-            vals: list = [z_12[t], z_6[t], z_3[t]]
-            vals: list = [v for v in vals if v is not None]
-
-            scores[t] = np.mean(vals) if vals else None
-
-        return scores
+        return self.factor_score("momentum")
 
     def lowvol_score_calculator(self) -> dict:
         """
         Low-vol factor Z-score calculation using inverse of volatility.
         """
-        tickers: list = self.universe
-
-        vol252: dict = {t: self.metrics[t].get("volatility_252") for t in tickers}
-        vol180: dict = {t: self.metrics[t].get("volatility_180") for t in tickers}
-
-        vol252_r: dict = {
-            t: (-vol252[t] if vol252[t] is not None else None) for t in tickers
-        }
-        vol180_r: dict = {
-            t: (-vol180[t] if vol180[t] is not None else None) for t in tickers
-        }
-
-        vol252_r = self.winsorize(vol252_r)
-        vol180_r = self.winsorize(vol180_r)
-
-        z_252: dict = self.z_score_calculator(vol252_r)
-        z_180: dict = self.z_score_calculator(vol180_r)
-
-        scores: dict = {}
-
-        for t in tickers:
-            vals: list = [z_252[t], z_180[t]]
-            vals: list = [v for v in vals if v is not None]
-
-            scores[t] = np.mean(vals) if vals else None
-
-        return scores
+        return self.factor_score("lowvol")
 
     def quality_score_calculator(self) -> dict:
         """
         Quality factor Z-score calculation using profitability and leverage signals.
         """
-        tickers: list = self.universe
-
-        roe: dict = {t: self.metrics[t].get("roe") for t in tickers}
-        gp: dict = {t: self.metrics[t].get("gross_profitability") for t in tickers}
-        pm: dict = {t: self.metrics[t].get("profit_margin") for t in tickers}
-        lev: dict = {t: self.metrics[t].get("leverage") for t in tickers}
+        return self.factor_score("quality")
 
-        lev_rev: dict = {t: (-lev[t] if lev[t] is not None else None) for t in lev}
-
-        roe = self.winsorize(roe)
-        gp = self.winsorize(gp)
-        pm = self.winsorize(pm)
-        lev_rev = self.winsorize(lev_rev)
+    def market_risk_score_calculator(self) -> dict:
+        """
+        Market Risk factor Z-score calculation using inverse of beta.
+        """
+        return self.factor_score("market_risk")
 
-        z_roe: dict = self.z_score_calculator(roe)
-        z_gp: dict = self.z_score_calculator(gp)
-        z_pm: dict = self.z_score_calculator(pm)
-        z_lev: dict = self.z_score_calculator(lev_rev)
+    # -------------------------------
+    # Snapshot
+    # -------------------------------
 
-        scores: dict = {}
+    def factor_scores(self) -> dict[str, dict]:
+        """
+        Returns all registered factor scores, computed once per metrics version.
+        """
+        if self.score_cache is None or self.score_cache_version != self.metrics_version:
+            self.score_cache = {
+                name: self.factor_score(name) for name in self.plan.factor_names
+            }
+            self.score_cache_version = self.metrics_version
 
-        for t in tickers:
-            vals: list = [z_roe[t], z_gp[t], z_pm[t], z_lev[t]]
-            vals: list = [v for v in vals if v is not None]
+            try:
+                self.save_history()
+            except Exception as e:
+                print(f"Could not save factor history: {e}")
 
-            scores[t] = np.mean(vals) if vals else None
+        return self.score_cache
 
-        return scores
+    # -------------------------------
+    # History
+    # -------------------------------
 
-    def market_risk_score_calculator(self) -> dict:
+    def as_of(self) -> date:
         """
-        Market Risk factor Z-score calculation using inverse of beta.
+        As-of date of the current metrics (latest last_updated, else today).
         """
-        tickers: list = self.universe
+        stamps: list[str] = [
+            self.metrics[t]["last_updated"]
+            for t in self.universe
+            if self.metrics[t].get("last_updated")
+        ]
+        if not stamps:
+            return datetime.now(timezone.utc).date()
+        return max(datetime.fromisoformat(s) for s in stamps).date()
 
-        beta: dict = {t: self.metrics[t].get("beta") for t in tickers}
+    def save_history(self) -> None:
+        """
+        Persists the current factor-score snapshot into the history store.
+        """
+        df: pd.DataFrame = pd.DataFrame(
+            self.factor_matrix(), columns=self.plan.factor_names
+        )
+        df.insert(0, "ticker", self.universe)
+        df["metrics_version"] = self.metrics_version
+        self.metric_builder.store.save_factor_snapshot(self.as_of(), df)
+
+    def score_history(
+        self,
+        ticker: str,
+        factor: str,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> pd.Series:
+        """
+        Stored scores of one factor for one ticker, indexed by as-of date.
+        """
+        df: pd.DataFrame = self.metric_builder.store.load_factor_history(
+            start, end, tickers=[ticker], factors=[factor]
+        )
+        return df.set_index("as_of")[factor].rename(ticker)
 
-        beta_rev: dict = {t: (-beta[t] if beta[t] is not None else None) for t in beta}
+    def scores_as_of(self, as_of: date) -> dict[str, dict]:
+        """
+        All factor scores from the latest stored snapshot on or before as_of,
+        in the same shape as factor_scores().
+        """
+        return stored_scores_as_of(
+            self.metric_builder.store, self.plan.factor_names, as_of
+        )
 
-        beta_rev = self.winsorize(beta_rev)
 
-        return self.z_score_calculator(beta_rev)
+def stored_scores_as_of(
+    store: DataStore, factor_names: list[str], as_of: date
+) -> dict[str, dict]:
+    """
+    Factor scores from the latest history snapshot on or before as_of,
+    as {factor: {ticker: score}}.
+    """
+    dates: list[date] = [d for d in store.factor_history_dates() if d <= as_of]
+    if not dates:
+        return {}
+
+    df: pd.DataFrame = store.load_factor_history(start=dates[-1], end=dates[-1])
+    df = df.set_index("ticker")
+    factors: list[str] = [f for f in factor_names if f in df.columns]
+
+    return {
+        f: {t: (None if pd.isna(v) else float(v)) for t, v in df[f].items()}
+        for f in factors
+    }
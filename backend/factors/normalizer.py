@@ -0,0 +1,325 @@
+"""
+normalizer.py
+
+Matrix-based winsorization and sector-neutral z-scoring.
+Operates on a tickers × signals array (NaN = missing) using grouped
+NumPy reductions over a sector index that is built once per universe.
+Per-sector and global statistics are kept as Welford state so single
+ticker refreshes can be applied incrementally.
+"""
+
+import numpy as np
+
+
+def grouped_moments(
+    matrix: np.ndarray, codes: np.ndarray, n_groups: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-group, per-column count, mean and sum of squared deviations (M2).
+    Rows with a negative group code and NaN cells are ignored.
+    """
+    n_rows, n_cols = matrix.shape
+    size: int = n_groups * n_cols
+
+    selected: np.ndarray = ~np.isnan(matrix) & (codes >= 0)[:, None]
+    cells: np.ndarray = (codes[:, None] * n_cols + np.arange(n_cols))[selected]
+    values: np.ndarray = matrix[selected]
+
+    count: np.ndarray = np.bincount(cells, minlength=size).astype(float)
+    total: np.ndarray = np.bincount(cells, weights=values, minlength=size)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean: np.ndarray = total / count
+
+    deviation: np.ndarray = values - mean[cells]
+    m2: np.ndarray = np.bincount(cells, weights=deviation * deviation, minlength=size)
+
+    shape: tuple[int, int] = (n_groups, n_cols)
+    return count.reshape(shape), mean.reshape(shape), m2.reshape(shape)
+
+
+class RunningMoments:
+    """
+    Welford state (count, mean, M2) per group × column.
+    Rows can be added or removed one at a time; NaN cells are skipped.
+    """
+
+    def __init__(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        self.count: np.ndarray = count
+        self.mean: np.ndarray = mean
+        self.m2: np.ndarray = m2
+
+    @classmethod
+    def from_matrix(
+        cls, matrix: np.ndarray, codes: np.ndarray, n_groups: int
+    ) -> "RunningMoments":
+        return cls(*grouped_moments(matrix, codes, n_groups))
+
+    def add(self, group: int, row: np.ndarray) -> None:
+        if group < 0:
+            return
+        valid: np.ndarray = ~np.isnan(row)
+        count: np.ndarray = self.count[group] + valid
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta: np.ndarray = row - np.where(
+                self.count[group] > 0, self.mean[group], 0.0
+            )
+            mean: np.ndarray = np.where(self.count[group] > 0, self.mean[group], 0.0)
+            mean = mean + delta / count
+            m2: np.ndarray = self.m2[group] + delta * (row - mean)
+
+        self.count[group] = count
+        self.mean[group] = np.where(valid, mean, self.mean[group])
+        self.m2[group] = np.where(valid, m2, self.m2[group])
+
+    def remove(self, group: int, row: np.ndarray) -> None:
+        if group < 0:
+            return
+        valid: np.ndarray = ~np.isnan(row)
+        count: np.ndarray = self.count[group] - valid
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta: np.ndarray = row - self.mean[group]
+            mean: np.ndarray = self.mean[group] - delta / count
+            m2: np.ndarray = self.m2[group] - delta * (row - mean)
+
+        mean = np.where(count > 0, mean, np.nan)
+        m2 = np.where(count > 1, np.maximum(m2, 0.0), 0.0)
+
+        self.count[group] = count
+        self.mean[group] = np.where(valid, mean, self.mean[group])
+        self.m2[group] = np.where(valid, m2, self.m2[group])
+
+    def population_std(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(self.m2 / self.count)
+
+    def sample_std(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(self.m2 / (self.count - 1))
+
+
+class SectorNormalizer:
+    """
+    Winsorizes and sector z-scores every column of a signal matrix in one pass.
+
+    Semantics:
+    - winsorization clips at mean ± (limit × sample std) of each column
+    - sector z-scores use the population std within each sector
+    - sectors with fewer than 2 values or zero std, and tickers without
+      a sector, fall back to global z-scores using the sample std
+    """
+
+    def __init__(self, universe: list[str], sector_map: dict[str, str]) -> None:
+        self.universe: list[str] = universe
+        self.sectors: list[str] = sorted(
+            {sector_map[t] for t in universe if t in sector_map}
+        )
+        self.sector_codes: dict[str, int] = {s: i for i, s in enumerate(self.sectors)}
+        self.codes: np.ndarray = np.array(
+            [self.code_for(sector_map.get(t)) for t in universe], dtype=np.int64
+        )
+        self.global_codes: np.ndarray = np.zeros(len(universe), dtype=np.int64)
+
+    def code_for(self, sector: str | None) -> int:
+        """Sector index of a sector name, -1 when unknown or missing."""
+        return self.sector_codes.get(sector, -1)
+
+    def bounds(
+        self, moments: RunningMoments, limit: float = 3.0
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Clipping bounds from global moments of the raw values.
+        Columns with fewer than 2 values get infinite bounds (no clipping).
+        """
+        count: np.ndarray = moments.count[0]
+        mean: np.ndarray = moments.mean[0]
+        std: np.ndarray = moments.sample_std()[0]
+
+        enough: np.ndarray = count >= 2
+        lower: np.ndarray = np.where(enough, mean - limit * std, -np.inf)
+        upper: np.ndarray = np.where(enough, mean + limit * std, np.inf)
+        return lower, upper
+
+    def winsorize_bounds(
+        self, matrix: np.ndarray, limit: float = 3.0
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Lower and upper clipping bounds per column.
+        """
+        moments: RunningMoments = RunningMoments.from_matrix(
+            matrix, self.global_codes, 1
+        )
+        return self.bounds(moments, limit)
+
+    def winsorize(self, matrix: np.ndarray, limit: float = 3.0) -> np.ndarray:
+        """
+        Clips extreme values using mean ± (limit × std), column by column.
+        """
+        lower, upper = self.winsorize_bounds(matrix, limit)
+        return np.clip(matrix, lower, upper)
+
+    def sector_ok(self, sector: RunningMoments) -> np.ndarray:
+        """Sectors × columns mask of cells usable for sector z-scoring."""
+        return (sector.count >= 2) & (sector.population_std() > 0)
+
+    def z_from_moments(
+        self,
+        matrix: np.ndarray,
+        codes: np.ndarray,
+        sector: RunningMoments,
+        global_: RunningMoments,
+    ) -> np.ndarray:
+        """
+        Z-scores the given rows against precomputed sector and global moments.
+        """
+        sector_ok: np.ndarray = self.sector_ok(sector)
+        sector_std: np.ndarray = sector.population_std()
+
+        has_sector: np.ndarray = codes >= 0
+        row_codes: np.ndarray = np.where(has_sector, codes, 0)
+
+        if len(self.sectors):
+            row_ok: np.ndarray = sector_ok[row_codes] & has_sector[:, None]
+            row_mean: np.ndarray = sector.mean[row_codes]
+            row_std: np.ndarray = np.where(row_ok, sector_std[row_codes], 1.0)
+        else:
+            row_ok = np.zeros(matrix.shape, dtype=bool)
+            row_mean = np.zeros(matrix.shape)
+            row_std = np.ones(matrix.shape)
+
+        z: np.ndarray = np.where(row_ok, (matrix - row_mean) / row_std, np.nan)
+
+        # Global fallback z-scoring
+        g_count: np.ndarray = global_.count[0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            global_z: np.ndarray = (matrix - global_.mean[0]) / global_.sample_std()[0]
+
+        global_z = np.where(g_count >= 2, global_z, np.nan)
+
+        return np.where(row_ok, z, global_z)
+
+    def z_score(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Computes sector neutral Z-scores with global Z-score fallback.
+        """
+        sector: RunningMoments = RunningMoments.from_matrix(
+            matrix, self.codes, len(self.sectors)
+        )
+        global_: RunningMoments = RunningMoments.from_matrix(
+            matrix, self.global_codes, 1
+        )
+        return self.z_from_moments(matrix, self.codes, sector, global_)
+
+    def normalize(self, matrix: np.ndarray, limit: float = 3.0) -> np.ndarray:
+        """
+        Winsorizes then sector z-scores every column of the matrix.
+        """
+        return self.z_score(self.winsorize(matrix, limit))
+
+
+class NormalizedSignals:
+    """
+    Raw, winsorized and z-scored signal matrices plus the running statistics
+    behind them, so a single ticker refresh only re-scores the affected rows.
+    """
+
+    def __init__(
+        self,
+        normalizer: SectorNormalizer,
+        raw: np.ndarray,
+        limit: float = 3.0,
+        max_changed_fraction: float = 0.1,
+    ) -> None:
+        self.normalizer: SectorNormalizer = normalizer
+        self.raw: np.ndarray = raw.copy()
+        self.limit: float = limit
+        self.max_changed_fraction: float = max_changed_fraction
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """
+        Full recompute of bounds, statistics and z-scores.
+        """
+        normalizer: SectorNormalizer = self.normalizer
+
+        self.raw_moments: RunningMoments = RunningMoments.from_matrix(
+            self.raw, normalizer.global_codes, 1
+        )
+        self.lower, self.upper = normalizer.bounds(self.raw_moments, self.limit)
+        self.winsorized: np.ndarray = np.clip(self.raw, self.lower, self.upper)
+
+        self.sector_moments: RunningMoments = RunningMoments.from_matrix(
+            self.winsorized, normalizer.codes, len(normalizer.sectors)
+        )
+        self.global_moments: RunningMoments = RunningMoments.from_matrix(
+            self.winsorized, normalizer.global_codes, 1
+        )
+        self.z: np.ndarray = normalizer.z_from_moments(
+            self.winsorized, normalizer.codes, self.sector_moments, self.global_moments
+        )
+
+    def update_row(self, row: int, values: np.ndarray, code: int) -> np.ndarray:
+        """
+        Replaces one ticker's raw signals (and sector code) and returns the
+        indices of rows whose z-scores were recomputed.
+
+        Winsorization bounds are maintained incrementally. Rows whose clipped
+        value moves with the bounds are re-applied to the statistics; if that
+        touches too many rows, everything is rebuilt from scratch.
+        """
+        normalizer: SectorNormalizer = self.normalizer
+        codes: np.ndarray = normalizer.codes
+        n_rows: int = len(codes)
+        old_code: int = int(codes[row])
+
+        self.raw_moments.remove(0, self.raw[row])
+        self.raw[row] = values
+        self.raw_moments.add(0, values)
+        self.lower, self.upper = normalizer.bounds(self.raw_moments, self.limit)
+
+        winsorized: np.ndarray = np.clip(self.raw, self.lower, self.upper)
+        moved: np.ndarray = (winsorized != self.winsorized) & ~(
+            np.isnan(winsorized) & np.isnan(self.winsorized)
+        )
+        changed: np.ndarray = np.flatnonzero(moved.any(axis=1))
+        if old_code != code and row not in changed:
+            changed = np.append(changed, row)
+
+        if len(changed) > self.max_changed_fraction * n_rows:
+            codes[row] = code
+            self.rebuild()
+            return np.arange(n_rows)
+
+        affected: set[int] = set()
+        for r in changed:
+            before: int = old_code if r == row else int(codes[r])
+            after: int = code if r == row else int(codes[r])
+
+            self.sector_moments.remove(before, self.winsorized[r])
+            self.sector_moments.add(after, winsorized[r])
+            self.global_moments.remove(0, self.winsorized[r])
+            self.global_moments.add(0, winsorized[r])
+            affected.update({before, after})
+
+        codes[row] = code
+        self.winsorized = winsorized
+
+        if len(normalizer.sectors):
+            sector_ok: np.ndarray = normalizer.sector_ok(self.sector_moments)
+            row_ok: np.ndarray = sector_ok[np.where(codes >= 0, codes, 0)].all(axis=1)
+        else:
+            row_ok = np.zeros(n_rows, dtype=bool)
+
+        fallback: np.ndarray = (codes < 0) | ~row_ok
+        rows: np.ndarray = np.flatnonzero(
+            np.isin(codes, list(affected))
+            | fallback
+            | np.isin(np.arange(n_rows), changed)
+        )
+
+        self.z[rows] = normalizer.z_from_moments(
+            winsorized[rows], codes[rows], self.sector_moments, self.global_moments
+        )
+        return rows
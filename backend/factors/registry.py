@@ -0,0 +1,172 @@
+"""
+registry.py
+
+Declarative factor definitions. Each factor is a list of signals (a derived
+metric, a sign, an optional transform and a weight). The registry compiles
+all declarations into a single FactorPlan that normalizes every distinct
+signal exactly once and aggregates factors with one matrix product.
+
+Adding a factor is configuration, e.g.:
+
+    DEFAULT_REGISTRY.register(
+        "dividend_yield", [Signal("dividend_yield")]
+    )
+"""
+
+from typing import Any, Callable
+
+import numpy as np
+
+
+def positive_log(values: np.ndarray) -> np.ndarray:
+    """Natural log of positive values; non-positive values become missing."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(values > 0, np.log(values), np.nan)
+
+
+TRANSFORMS: dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "log": positive_log,
+}
+
+
+class Signal:
+    """
+    One input of a factor: sign × transform(metric), combined with the given weight.
+    """
+
+    def __init__(
+        self,
+        metric: str,
+        sign: float = 1.0,
+        weight: float = 1.0,
+        transform: str | None = None,
+    ) -> None:
+        if transform is not None and transform not in TRANSFORMS:
+            raise ValueError(f"Unknown signal transform: {transform}")
+
+        self.metric: str = metric
+        self.sign: float = sign
+        self.weight: float = weight
+        self.transform: str | None = transform
+
+    @property
+    def key(self) -> tuple[str, float, str | None]:
+        """Identity of the normalized column, shared across factors."""
+        return (self.metric, self.sign, self.transform)
+
+    @property
+    def name(self) -> str:
+        prefix: str = "neg_" if self.sign < 0 else ""
+        transform: str = f"{self.transform}_" if self.transform else ""
+        return f"{prefix}{transform}{self.metric}"
+
+
+class FactorPlan:
+    """
+    Compiled execution plan: distinct signal columns plus a
+    signals × factors weight matrix.
+    """
+
+    def __init__(self, factors: dict[str, list[Signal]]) -> None:
+        self.factor_names: list[str] = list(factors)
+
+        columns: dict[tuple, Signal] = {}
+        for signals in factors.values():
+            for signal in signals:
+                columns.setdefault(signal.key, signal)
+
+        self.signals: list[Signal] = list(columns.values())
+        self.signal_names: list[str] = [s.name for s in self.signals]
+
+        column_index: dict[tuple, int] = {k: i for i, k in enumerate(columns)}
+        self.weights: np.ndarray = np.zeros((len(self.signals), len(self.factor_names)))
+        for j, signals in enumerate(factors.values()):
+            for signal in signals:
+                self.weights[column_index[signal.key], j] += signal.weight
+
+    def raw_matrix(
+        self, metrics: dict[str, dict[str, Any] | None], universe: list[str]
+    ) -> np.ndarray:
+        """
+        Extracts every signal column as a tickers × signals array (NaN = missing).
+        """
+        matrix: np.ndarray = np.empty((len(universe), len(self.signals)))
+
+        for i, signal in enumerate(self.signals):
+            values: np.ndarray = np.array(
+                [
+                    (
+                        np.nan
+                        if metrics[t].get(signal.metric) is None
+                        else metrics[t].get(signal.metric)
+                    )
+                    for t in universe
+                ],
+                dtype=float,
+            )
+            if signal.transform is not None:
+                values = TRANSFORMS[signal.transform](values)
+            matrix[:, i] = signal.sign * values
+
+        return matrix
+
+    def combine(self, z: np.ndarray) -> np.ndarray:
+        """
+        Weighted average of the available signal z-scores per factor.
+        Tickers with no available signal for a factor get NaN.
+        """
+        valid: np.ndarray = ~np.isnan(z)
+        total: np.ndarray = np.where(valid, z, 0.0) @ self.weights
+        weight: np.ndarray = valid.astype(float) @ self.weights
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(weight > 0, total / weight, np.nan)
+
+
+class FactorRegistry:
+    """
+    Ordered collection of factor declarations.
+    """
+
+    def __init__(self) -> None:
+        self.factors: dict[str, list[Signal]] = {}
+
+    def register(self, name: str, signals: list[Signal]) -> None:
+        if not signals:
+            raise ValueError(f"Factor {name} needs at least one signal")
+        self.factors[name] = list(signals)
+
+    def compile(self) -> FactorPlan:
+        return FactorPlan(self.factors)
+
+
+DEFAULT_REGISTRY: FactorRegistry = FactorRegistry()
+
+DEFAULT_REGISTRY.register(
+    "value",
+    [
+        Signal("book_to_market"),
+        Signal("earnings_to_price"),
+        Signal("cashflow_to_price"),
+        Signal("sales_to_price"),
+    ],
+)
+DEFAULT_REGISTRY.register("size", [Signal("market_cap", sign=-1, transform="log")])
+DEFAULT_REGISTRY.register(
+    "momentum",
+    [Signal("momentum_12_1"), Signal("momentum_6_1"), Signal("momentum_3_1")],
+)
+DEFAULT_REGISTRY.register(
+    "lowvol",
+    [Signal("volatility_252", sign=-1), Signal("volatility_180", sign=-1)],
+)
+DEFAULT_REGISTRY.register(
+    "quality",
+    [
+        Signal("roe"),
+        Signal("gross_profitability"),
+        Signal("profit_margin"),
+        Signal("leverage", sign=-1),
+    ],
+)
+DEFAULT_REGISTRY.register("market_risk", [Signal("beta", sign=-1)])
@@ -0,0 +1,132 @@
+"""
+shared_snapshot.py
+
+Read-only factor snapshot backed by memory-mapped arrays in the DataStore.
+One process computes factors and writes the snapshot; every API worker maps
+the same files, so the universe is loaded and normalized once, not per worker.
+"""
+
+from datetime import date
+from typing import Any
+
+import numpy as np
+
+from backend.data_store.storage import DataStore
+from backend.factors.factor_model import FactorCalculator, stored_scores_as_of
+from backend.metrics.metric_builder import MetricBuilder
+
+
+class SharedFactorSnapshot:
+    """
+    Provides the read side of FactorCalculator that RankingEngine uses
+    (factor matrix, signal matrices, metrics and history lookups) from a
+    mapped serving snapshot. Incremental updates are not supported.
+
+    Everything the ranking path reads is a mapped array. Per-ticker metrics
+    are only parsed when first requested.
+    """
+
+    # Bumped when the files of a serving snapshot change
+    LAYOUT: int = 2
+
+    def __init__(self, store: DataStore, version: str) -> None:
+        arrays, meta = store.load_serving_snapshot(version)
+        if meta.get("layout") != self.LAYOUT:
+            raise RuntimeError(f"Serving snapshot {version} has an older layout")
+
+        self.store: DataStore = store
+        self.version: str = version
+        self.metrics_version: str = meta["metrics_version"]
+        self.universe: list[str] = meta["universe"]
+        self.factor_names: list[str] = meta["factor_names"]
+        self.signal_names: list[str] = meta["signal_names"]
+        self.sectors: list[str] = meta["sectors"]
+        # Digest of the universe metrics snapshot this was built from
+        self.universe_snapshot: str | None = meta.get("universe_snapshot")
+
+        self.factors: np.ndarray = arrays["factors"]
+        self.values: np.ndarray = arrays["values"]
+        self.mask: np.ndarray = arrays["mask"]
+        self.sector_codes: np.ndarray = arrays["sector_codes"]
+        self.caps: np.ndarray = arrays["market_caps"]
+        self.winsorized: np.ndarray = arrays["winsorized"]
+        self.signal_z: np.ndarray = arrays["signal_z"]
+        self.metrics_cache: dict[str, dict[str, Any]] | None = None
+        self.score_cache: dict[str, dict] | None = None
+
+    @staticmethod
+    def write(store: DataStore, factors: FactorCalculator) -> str:
+        """
+        Publishes a computed FactorCalculator as the current serving snapshot,
+        recording the digest of the universe metrics snapshot on disk.
+        Returns its version.
+        """
+        winsorized, signal_z = factors.signal_matrices()
+        values, mask = factors.dense_factors()
+        sectors, sector_codes = factors.sector_index()
+        store.save_serving_snapshot(
+            factors.metrics_version,
+            {
+                "factors": factors.factor_matrix(),
+                "values": values,
+                "mask": mask,
+                "sector_codes": sector_codes,
+                "market_caps": factors.market_caps(),
+                "winsorized": winsorized,
+                "signal_z": signal_z,
+            },
+            {
+                "layout": SharedFactorSnapshot.LAYOUT,
+                "metrics_version": factors.metrics_version,
+                "universe": factors.universe,
+                "factor_names": factors.factor_names,
+                "signal_names": factors.signal_names,
+                "sectors": sectors,
+                "universe_snapshot": store.snapshot_digest(MetricBuilder.SNAPSHOT_NAME),
+            },
+            documents={"metrics": {t: factors.metrics[t] for t in factors.universe}},
+        )
+        return factors.metrics_version
+
+    @property
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """
+        {ticker: metrics}, read from the snapshot on first use.
+        """
+        if self.metrics_cache is None:
+            self.metrics_cache = self.store.load_serving_document(
+                self.version, "metrics"
+            )
+        return self.metrics_cache
+
+    def factor_matrix(self) -> np.ndarray:
+        return self.factors
+
+    def signal_matrices(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.winsorized, self.signal_z
+
+    def dense_factors(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.values, self.mask
+
+    def sector_index(self) -> tuple[list[str], np.ndarray]:
+        return self.sectors, self.sector_codes
+
+    def market_caps(self) -> np.ndarray:
+        return self.caps
+
+    def factor_scores(self) -> dict[str, dict]:
+        """
+        {factor: {ticker: score}}, built once from the mapped matrix.
+        """
+        if self.score_cache is None:
+            self.score_cache = {
+                name: {
+                    t: (None if np.isnan(v) else float(v))
+                    for t, v in zip(self.universe, self.factors[:, j])
+                }
+                for j, name in enumerate(self.factor_names)
+            }
+        return self.score_cache
+
+    def scores_as_of(self, as_of: date) -> dict[str, dict]:
+        return stored_scores_as_of(self.store, self.factor_names, as_of)
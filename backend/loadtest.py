@@ -0,0 +1,428 @@
+"""
+loadtest.py
+
+Load-test harness for the API. Drives the FastAPI app in-process through an
+ASGI transport (or a running server with --url) at one or more concurrency
+levels and reports throughput and latency percentiles per scenario.
+
+Runs offline on synthetic metrics, or on a replayed data store, e.g.:
+
+    python -m backend.loadtest --concurrency 1,8,32 --requests 500
+    python -m backend.loadtest --save-baseline loadtest_baseline.json
+    python -m backend.loadtest --baseline loadtest_baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any
+
+import httpx
+import numpy as np
+
+FACTORS: list[str] = ["value", "size", "momentum", "lowvol", "quality", "market_risk"]
+
+SECTORS: list[str] = [
+    "Communication Services",
+    "Consumer Cyclical",
+    "Consumer Defensive",
+    "Energy",
+    "Financial Services",
+    "Healthcare",
+    "Industrials",
+    "Basic Materials",
+    "Real Estate",
+    "Technology",
+    "Utilities",
+]
+
+# Weight presets offered by the frontend; most traffic reuses these
+PRESETS: list[dict[str, float]] = [
+    {f: 1 / 6 for f in FACTORS},
+    dict(value=0.2, size=0.2, momentum=0.2, lowvol=0.15, quality=0.15, market_risk=0.1),
+    dict(value=0.5, size=0.0, momentum=0.0, lowvol=0.0, quality=0.5, market_risk=0.0),
+    dict(value=0.0, size=0.0, momentum=0.6, lowvol=0.2, quality=0.2, market_risk=0.0),
+    dict(value=0.1, size=0.0, momentum=0.1, lowvol=0.4, quality=0.3, market_risk=0.1),
+]
+
+
+# -------------------------------
+# Synthetic data
+# -------------------------------
+
+
+def synthetic_metrics(
+    universe: list[str], seed: int = 0, missing: float = 0.03
+) -> dict[str, dict[str, Any]]:
+    """
+    Derived metrics with roughly realistic cross-sectional distributions.
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    n: int = len(universe)
+
+    columns: dict[str, np.ndarray] = {
+        "market_cap": rng.lognormal(24.0, 1.2, n),
+        "book_to_market": rng.lognormal(-1.2, 0.7, n),
+        "earnings_to_price": rng.normal(0.05, 0.04, n),
+        "cashflow_to_price": rng.normal(0.06, 0.05, n),
+        "sales_to_price": rng.lognormal(-1.0, 0.8, n),
+        "momentum_12_1": rng.normal(0.10, 0.30, n),
+        "momentum_6_1": rng.normal(0.05, 0.20, n),
+        "momentum_3_1": rng.normal(0.02, 0.12, n),
+        "volatility_252": rng.lognormal(-1.3, 0.35, n),
+        "volatility_180": rng.lognormal(-1.3, 0.40, n),
+        "roe": rng.normal(0.15, 0.15, n),
+        "gross_profitability": rng.normal(0.30, 0.15, n),
+        "profit_margin": rng.normal(0.10, 0.10, n),
+        "leverage": rng.lognormal(0.0, 0.8, n),
+        "beta": rng.normal(1.0, 0.35, n),
+    }
+    sectors: np.ndarray = rng.choice(len(SECTORS), n)
+    gaps: np.ndarray = rng.random((n, len(columns))) < missing
+
+    metrics: dict[str, dict[str, Any]] = {}
+    for i, ticker in enumerate(universe):
+        row: dict[str, Any] = {"ticker": ticker, "sector": SECTORS[sectors[i]]}
+        for j, (name, values) in enumerate(columns.items()):
+            row[name] = None if gaps[i, j] else float(values[i])
+        row["last_updated"] = "2024-01-02T21:00:00+00:00"
+        metrics[ticker] = row
+
+    return metrics
+
+
+def prepare_store(path: str, universe_size: int | None, seed: int) -> None:
+    """
+    Writes a synthetic universe metrics snapshot the API warms up from.
+    """
+    from backend.data.universe import load_sp500_universe
+    from backend.data_store.storage import DataStore
+    from backend.metrics.metric_builder import MetricBuilder
+
+    universe: list[str] = (
+        load_sp500_universe()
+        if universe_size is None
+        else [f"T{i:05d}" for i in range(universe_size)]
+    )
+    DataStore(path).save_snapshot(
+        MetricBuilder.SNAPSHOT_NAME, synthetic_metrics(universe, seed)
+    )
+
+
+def random_weights(rng: random.Random, preset_share: float) -> dict[str, float]:
+    """
+    A frontend preset with probability preset_share, else random Dirichlet weights.
+    """
+    if rng.random() < preset_share:
+        return dict(rng.choice(PRESETS))
+    draws: list[float] = [rng.gammavariate(1.0, 1.0) for _ in FACTORS]
+    total: float = sum(draws)
+    return {f: round(d / total, 4) for f, d in zip(FACTORS, draws)}
+
+
+# -------------------------------
+# Scenarios
+# -------------------------------
+
+
+def build_request(
+    scenario: str, rng: random.Random, preset_share: float
+) -> tuple[str, str, dict[str, Any]]:
+    """
+    Method, path and httpx keyword arguments for one request of a scenario.
+    """
+    if scenario == "factors":
+        return "GET", "/factors", {}
+
+    weights: dict[str, float] = random_weights(rng, preset_share)
+    if scenario == "rank_top":
+        return "POST", "/rank", {"json": weights, "params": {"limit": 20}}
+    if scenario == "rank_full":
+        return "POST", "/rank", {"json": weights}
+    if scenario == "rank_get":
+        return "GET", "/rank", {"params": {**weights, "limit": 20}}
+
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+SCENARIOS: tuple[str, ...] = ("rank_top", "rank_full", "rank_get", "factors")
+
+
+# -------------------------------
+# Driver
+# -------------------------------
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    scenario: str,
+    concurrency: int,
+    n_requests: int,
+    seed: int,
+    preset_share: float,
+) -> dict[str, Any]:
+    """
+    Sends n_requests with at most `concurrency` in flight and summarizes them.
+    """
+    rng: random.Random = random.Random(seed)
+    requests: list[tuple[str, str, dict[str, Any]]] = [
+        build_request(scenario, rng, preset_share) for _ in range(n_requests)
+    ]
+    latencies: list[float] = []
+    errors: int = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            method, path, kwargs = queue.get_nowait()
+            start: float = time.perf_counter()
+            try:
+                response: httpx.Response = await client.request(method, path, **kwargs)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed: float = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "rps": n_requests / elapsed,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"API not ready after {timeout}s")
+
+
+async def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    levels: list[int] = [int(c) for c in args.concurrency.split(",")]
+    scenarios: list[str] = args.scenario.split(",")
+
+    async def drive(client: httpx.AsyncClient) -> list[dict[str, Any]]:
+        await wait_ready(client, args.ready_timeout)
+        results: list[dict[str, Any]] = []
+        for scenario in scenarios:
+            for level in levels:
+                # Warm the per-process caches once so levels are comparable
+                await run_level(client, scenario, level, level, args.seed, 1.0)
+                results.append(
+                    await run_level(
+                        client,
+                        scenario,
+                        level,
+                        args.requests,
+                        args.seed,
+                        args.preset_share,
+                    )
+                )
+        return results
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await drive(client)
+
+    # The app is imported only after DATA_STORE_PATH points at the test store
+    from backend.api.main import app
+
+    transport: httpx.ASGITransport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=60
+        ) as client:
+            return await drive(client)
+
+
+# -------------------------------
+# Reporting
+# -------------------------------
+
+
+def print_report(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]] | None
+) -> None:
+    previous: dict[tuple, dict[str, Any]] = {
+        (r["scenario"], r["concurrency"]): r for r in baseline or []
+    }
+
+    header: str = (
+        f"{'scenario':<10} {'conc':>5} {'reqs':>6} {'err':>5} "
+        f"{'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for r in results:
+        print(
+            f"{r['scenario']:<10} {r['concurrency']:>5} {r['requests']:>6} "
+            f"{r['errors']:>5} {r['rps']:>9.1f} {r['p50_ms']:>8.2f} "
+            f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+        )
+        base: dict[str, Any] | None = previous.get((r["scenario"], r["concurrency"]))
+        if base is not None:
+            print(
+                f"{'  vs base':<10} {'':>5} {'':>6} {'':>5} "
+                f"{change(r['rps'], base['rps']):>9} "
+                f"{change(r['p50_ms'], base['p50_ms']):>8} "
+                f"{change(r['p95_ms'], base['p95_ms']):>8} "
+                f"{change(r['p99_ms'], base['p99_ms']):>8}"
+            )
+
+
+def change(current: float, base: float) -> str:
+    if not base:
+        return "n/a"
+    return f"{100 * (current - base) / base:+.1f}%"
+
+
+def regressions(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float
+) -> list[str]:
+    """
+    Scenario/level pairs whose RPS dropped or p95 rose by more than tolerance.
+    """
+    previous: dict[tuple, dict[str, Any]] = {
+        (r["scenario"], r["concurrency"]): r for r in baseline
+    }
+    found: list[str] = []
+    for r in results:
+        base: dict[str, Any] | None = previous.get((r["scenario"], r["concurrency"]))
+        if base is None:
+            continue
+        if r["rps"] < base["rps"] * (1 - tolerance):
+            found.append(
+                f"{r['scenario']}@{r['concurrency']}: rps {change(r['rps'], base['rps'])}"
+            )
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(
+                f"{r['scenario']}@{r['concurrency']}: p95 {change(r['p95_ms'], base['p95_ms'])}"
+            )
+    return found
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.loadtest", description=__doc__.split("\n\n")[1]
+    )
+    parser.add_argument(
+        "--scenario",
+        default="rank_top,rank_full,factors",
+        help=f"comma-separated, from {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument(
+        "--concurrency", default="1,8,32", help="comma-separated concurrency levels"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=300, help="requests per scenario and level"
+    )
+    parser.add_argument(
+        "--preset-share",
+        type=float,
+        default=0.7,
+        help="fraction of requests using a preset weight vector",
+    )
+    parser.add_argument(
+        "--universe",
+        type=int,
+        default=None,
+        help="synthetic universe size (default: S&P 500 list)",
+    )
+    parser.add_argument(
+        "--data-store",
+        default=None,
+        help="replay an existing data store instead of synthetic data",
+    )
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="target a running server instead of the in-process app",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="compare against results saved with --save-baseline",
+    )
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="allowed relative RPS drop / p95 increase vs baseline",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args: argparse.Namespace = parse_args(argv)
+
+    for scenario in args.scenario.split(","):
+        if scenario not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario: {scenario}")
+
+    if not args.url:
+        path: str = args.data_store or tempfile.mkdtemp(prefix="loadtest-store-")
+        if args.data_store is None:
+            prepare_store(path, args.universe, args.seed)
+        os.environ["DATA_STORE_PATH"] = path
+        # Never refresh from the network during a load test
+        os.environ.pop("REFRESH_AT", None)
+
+    results: list[dict[str, Any]] = asyncio.run(run(args))
+
+    baseline: list[dict[str, Any]] | None = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"created": time.time(), "results": results}, f, indent=4)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if baseline is not None:
+        found: list[str] = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
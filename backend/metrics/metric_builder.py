@@ -10,12 +10,14 @@ MAX_WORKERS = 4
 
 class MetricBuilder:
     METRICS_CATEGORY = "derived_metrics"
+    SNAPSHOT_NAME = "universe_metrics"
 
     def __init__(
         self, fundamentalcalculator: FundamentalCalculator, datastore: DataStore
     ) -> None:
         self.fundamental: FundamentalCalculator = fundamentalcalculator
         self.store: DataStore = datastore
+        self.progress: dict[str, int] = {"total": 0, "done": 0, "failed": 0}
 
     def build_metrics(self, ticker: str) -> dict[str, Any]:
         metrics: dict[str, Any] = {
@@ -59,8 +61,76 @@ class MetricBuilder:
         self.save_metrics(ticker, metrics)
         return metrics
 
+    def load_universe_snapshot(self) -> dict[str, Any] | None:
+        """
+        Loads the persisted universe-level metrics snapshot, if any, as
+        {"universe": requested tickers, "failed": tickers without metrics,
+        "metrics": {ticker: metrics}}. Older snapshots that are a plain
+        {ticker: metrics} map are converted.
+        """
+        snapshot: dict[str, Any] | None = self.store.load_snapshot(self.SNAPSHOT_NAME)
+        if not snapshot:
+            return None
+
+        if "universe" not in snapshot or "metrics" not in snapshot:
+            snapshot = {
+                "universe": list(snapshot),
+                "failed": [t for t, m in snapshot.items() if m is None],
+                "metrics": {t: m for t, m in snapshot.items() if m is not None},
+            }
+        return snapshot
+
+    def save_universe_snapshot(
+        self, metrics: dict[str, Any], universe: list[str] | None = None
+    ) -> None:
+        """
+        Persists metrics for the requested universe, recording the tickers
+        that have none so later starts can retry them.
+        """
+        universe = list(metrics) if universe is None else list(universe)
+        self.store.save_snapshot(
+            self.SNAPSHOT_NAME,
+            {
+                "universe": universe,
+                "failed": [t for t in universe if metrics.get(t) is None],
+                "metrics": {
+                    t: metrics[t] for t in universe if metrics.get(t) is not None
+                },
+            },
+        )
+
+    def complete_universe_snapshot(
+        self, snapshot: dict[str, Any]
+    ) -> dict[str, dict[str, Any] | None]:
+        """
+        Metrics for a snapshot's whole requested universe. Tickers that failed
+        when it was written are attempted again, and the snapshot is saved
+        once more if any of them now succeed.
+        """
+        universe: list[str] = snapshot["universe"]
+        metrics: dict[str, dict[str, Any] | None] = {
+            t: snapshot["metrics"].get(t) for t in universe
+        }
+
+        missing: list[str] = [t for t in universe if metrics[t] is None]
+        if not missing:
+            return metrics
+
+        print(f"Retrying metrics for {len(missing)} tickers missing from the snapshot")
+        retried: dict[str, dict[str, Any] | None] = self.load_universe_metrics(missing)
+        metrics.update(retried)
+
+        if any(m is not None for m in retried.values()):
+            try:
+                self.save_universe_snapshot(metrics, universe)
+            except Exception as e:
+                print(f"Could not save universe metrics snapshot: {e}")
+
+        return metrics
+
     def load_universe_metrics(self, universe: list, force_refresh=False) -> dict:
         universe_metrics: dict = {}
+        self.progress = {"total": len(universe), "done": 0, "failed": 0}
 
         # Warmup
         try:
@@ -84,5 +154,8 @@ class MetricBuilder:
                 except Exception as e:
                     print(f"Failed to build metrics for {ticker}: {e}")
                     universe_metrics[ticker] = None
+                    self.progress["failed"] += 1
+
+                self.progress["done"] += 1
 
         return universe_metrics
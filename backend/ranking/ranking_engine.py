@@ -3,79 +3,592 @@ ranking_engine.py
 
 Combines multiple factor scores into a single composite ranking.
 Responsible for weight normalization, score aggregation, and final ranking.
+Factor scores are held as a dense tickers × factors array with a
+missing-value mask so composites are a single masked matrix–vector product.
 """
 
+import threading
+from collections import OrderedDict
+from datetime import date
 from typing import Any
 
+import numpy as np
+
 from backend.factors.factor_model import FactorCalculator
+from backend.factors.shared_snapshot import SharedFactorSnapshot
+
+
+class CachedRanking:
+    """
+    Composite scores for one weight vector, with the full ordering built lazily.
+    """
+
+    def __init__(self, composite: np.ndarray, present: np.ndarray) -> None:
+        self.composite: np.ndarray = composite
+        self.present: np.ndarray = present
+        self.order: np.ndarray | None = None
 
 
 class RankingEngine:
-    def __init__(self, factor_calculator: FactorCalculator) -> None:
-        self.factor_calc: FactorCalculator = factor_calculator
-        self.scores = {}
+    def __init__(
+        self,
+        factor_calculator: FactorCalculator | SharedFactorSnapshot,
+        cache_size: int = 256,
+    ) -> None:
+        self.factor_calc: FactorCalculator | SharedFactorSnapshot = factor_calculator
+        self.cache_size: int = cache_size
+        self.result_cache: OrderedDict[tuple, CachedRanking] = OrderedDict()
+        self.cache_lock: threading.Lock = threading.Lock()
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.cache_evictions: int = 0
+        self.scores_version: str | None = None
+        self.tickers: list[str] = []
+        self.factor_names: list[str] = []
+        self.matrix: np.ndarray = np.empty((0, 0))
+        self.mask: np.ndarray = np.empty((0, 0), dtype=bool)
+        self.ticker_index: dict[str, int] = {}
+        self.sectors: list[str] = []
+        self.sector_codes: np.ndarray = np.empty(0, dtype=np.int64)
+        self.sector_masks: dict[str, np.ndarray] = {}
+        self.cap_order: np.ndarray = np.empty(0, dtype=np.int64)
+        self.sorted_caps: np.ndarray = np.empty(0)
+        self.sector_ranks: np.ndarray = np.empty((0, 0), dtype=np.int64)
+        self.sector_counts: np.ndarray = np.empty((0, 0), dtype=np.int64)
+        self.signal_names: list[str] = []
+        self.winsorized: np.ndarray = np.empty((0, 0))
+        self.signal_z: np.ndarray = np.empty((0, 0))
 
     def load_factor_scores(self) -> dict[str, Any]:
-        self.scores: dict[str, Any] = {
-            "value": self.factor_calc.value_score_calculator(),
-            "size": self.factor_calc.size_score_calculator(),
-            "momentum": self.factor_calc.momentum_score_calculator(),
-            "lowvol": self.factor_calc.lowvol_score_calculator(),
-            "quality": self.factor_calc.quality_score_calculator(),
-            "market_risk": self.factor_calc.market_risk_score_calculator(),
+        """
+        {factor: {ticker: score}} of the loaded snapshot. The dicts are built
+        by the factor source on first use; ranking only reads the arrays.
+        """
+        self.ensure_loaded()
+        return self.factor_calc.factor_scores()
+
+    def ensure_loaded(self) -> None:
+        if self.scores_version != self.factor_calc.metrics_version:
+            self.load()
+
+    def load(self) -> None:
+        """
+        Loads the factor and signal arrays of the current metrics version.
+        Arrays that can change (a computed FactorCalculator) are copied so
+        incremental updates never change a published snapshot; read-only
+        (memory-mapped) arrays are used as they are.
+        """
+        self.tickers = list(self.factor_calc.universe)
+        self.factor_names = list(self.factor_calc.factor_names)
+        self.signal_names = list(self.factor_calc.signal_names)
+
+        self.matrix, self.mask = self.factor_calc.dense_factors()
+        winsorized, signal_z = self.factor_calc.signal_matrices()
+        self.winsorized = (
+            winsorized.copy() if winsorized.flags.writeable else winsorized
+        )
+        self.signal_z = signal_z.copy() if signal_z.flags.writeable else signal_z
+
+        self.scores_version = self.factor_calc.metrics_version
+        self.build_indexes()
+        self.clear_cache()
+
+    def build_indexes(self) -> None:
+        """
+        Precomputes sector membership masks and a sorted market-cap array
+        for constrained ranking, plus per-factor ranks within each sector.
+        """
+        self.ticker_index = {t: i for i, t in enumerate(self.tickers)}
+
+        self.sectors, self.sector_codes = self.factor_calc.sector_index()
+        self.sector_masks = {
+            s: self.sector_codes == i for i, s in enumerate(self.sectors)
         }
 
-        return self.scores
+        caps: np.ndarray = self.factor_calc.market_caps()
+        valid: np.ndarray = np.flatnonzero(~np.isnan(caps))
+        self.cap_order = valid[np.argsort(caps[valid], kind="stable")]
+        self.sorted_caps = caps[self.cap_order]
+
+        self.build_sector_ranks()
 
-    def compute_composite_scores(self, weights: dict) -> dict:
+    def build_sector_ranks(self) -> None:
         """
-        Combine factor scores into a single score per stock.
-        Factor weights are normalized to add up to 1.
+        Rank of each ticker within its sector for every factor (1 = highest
+        score, 0 = unranked), and the number of ranked tickers per sector.
         """
+        n_rows, n_factors = self.matrix.shape
+        self.sector_ranks = np.zeros((n_rows, n_factors), dtype=np.int64)
+        self.sector_counts = np.zeros((len(self.sectors), n_factors), dtype=np.int64)
 
-        # Normalize weights to sum to 1
-        total_w: int = sum(weights.values())
+        for j in range(n_factors):
+            rows: np.ndarray = np.flatnonzero(
+                self.mask[:, j] & (self.sector_codes >= 0)
+            )
+            codes: np.ndarray = self.sector_codes[rows]
+
+            # Grouped by sector, then by score, ties in universe order
+            order: np.ndarray = np.lexsort((rows, -self.matrix[rows, j], codes))
+            rows, codes = rows[order], codes[order]
+
+            counts: np.ndarray = np.bincount(codes, minlength=len(self.sectors))
+            starts: np.ndarray = np.cumsum(counts) - counts
+            self.sector_ranks[rows, j] = np.arange(len(rows)) - starts[codes] + 1
+            self.sector_counts[:, j] = counts
+
+    def constraint_mask(
+        self, sectors: list[str] | None = None, min_market_cap: float | None = None
+    ) -> np.ndarray:
+        """
+        Tickers allowed by the sector and minimum market-cap filters.
+        """
+        allowed: np.ndarray = np.ones(len(self.tickers), dtype=bool)
+
+        if sectors is not None:
+            in_sectors: np.ndarray = np.zeros(len(self.tickers), dtype=bool)
+            for sector in sectors:
+                if sector in self.sector_masks:
+                    in_sectors |= self.sector_masks[sector]
+            allowed &= in_sectors
+
+        if min_market_cap is not None:
+            start: int = int(np.searchsorted(self.sorted_caps, min_market_cap, "left"))
+            large: np.ndarray = np.zeros(len(self.tickers), dtype=bool)
+            large[self.cap_order[start:]] = True
+            allowed &= large
+
+        return allowed
+
+    def cap_per_sector(self, order: np.ndarray, max_per_sector: int) -> np.ndarray:
+        """
+        Keeps at most max_per_sector names per sector from a ranked order.
+        Tickers without a sector are capped as their own group.
+        """
+        groups: np.ndarray = self.sector_codes[order]
+        groups = np.where(groups >= 0, groups, len(self.sectors))
+
+        by_group: np.ndarray = np.argsort(groups, kind="stable")
+        sorted_groups: np.ndarray = groups[by_group]
+        starts: np.ndarray = np.flatnonzero(
+            np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+        )
+        group_start: np.ndarray = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+
+        position: np.ndarray = np.empty(len(order), dtype=np.int64)
+        position[by_group] = np.arange(len(order)) - group_start
+        return order[position < max_per_sector]
+
+    # -------------------------------
+    # Result cache
+    # -------------------------------
+
+    def clear_cache(self) -> None:
+        with self.cache_lock:
+            self.result_cache.clear()
+
+    def cache_stats(self) -> dict[str, Any]:
+        with self.cache_lock:
+            lookups: int = self.cache_hits + self.cache_misses
+            return {
+                "size": len(self.result_cache),
+                "max_size": self.cache_size,
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "evictions": self.cache_evictions,
+                "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            }
+
+    def cached_ranking(self, weights: dict) -> CachedRanking:
+        """
+        LRU lookup keyed by snapshot version and the normalized weight vector.
+        """
+        self.ensure_loaded()
+        w: np.ndarray = self.weight_vector(weights, self.factor_names)
+        key: tuple = (self.scores_version, tuple(np.round(w, 12).tolist()))
+
+        with self.cache_lock:
+            entry: CachedRanking | None = self.result_cache.get(key)
+            if entry is not None:
+                self.result_cache.move_to_end(key)
+                self.cache_hits += 1
+                return entry
+            self.cache_misses += 1
+
+        entry = CachedRanking(self.matrix @ w, self.mask.any(axis=1))
+
+        with self.cache_lock:
+            self.result_cache[key] = entry
+            self.result_cache.move_to_end(key)
+            while len(self.result_cache) > self.cache_size:
+                self.result_cache.popitem(last=False)
+                self.cache_evictions += 1
+
+        return entry
+
+    def full_order(self, entry: CachedRanking) -> np.ndarray:
+        if entry.order is None:
+            entry.order = self.order(entry.composite, entry.present)
+        return entry.order
+
+    # -------------------------------
+    # Matrix helpers
+    # -------------------------------
+
+    def factor_array(self) -> np.ndarray:
+        """
+        Tickers × factors scores of the loaded snapshot, NaN where missing.
+        """
+        self.ensure_loaded()
+        return np.where(self.mask, self.matrix, np.nan)
+
+    def dense(self, factor_matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Splits a NaN-coded score array into zero-filled values and a present mask.
+        """
+        mask: np.ndarray = ~np.isnan(factor_matrix)
+        return np.where(mask, factor_matrix, 0.0), mask
+
+    def matrix_from_scores(
+        self, scores: dict[str, Any]
+    ) -> tuple[list[str], list[str], np.ndarray, np.ndarray]:
+        """
+        Builds tickers, factor names and the dense array from {factor: {ticker: score}}.
+        """
+        factor_names: list[str] = list(scores)
+        tickers: list[str] = list(dict.fromkeys(t for s in scores.values() for t in s))
+
+        raw: np.ndarray = np.array(
+            [
+                [
+                    np.nan if scores[f].get(t) is None else scores[f].get(t)
+                    for f in factor_names
+                ]
+                for t in tickers
+            ],
+            dtype=float,
+        ).reshape(len(tickers), len(factor_names))
+
+        matrix, mask = self.dense(raw)
+        return tickers, factor_names, matrix, mask
+
+    def weight_vector(self, weights: dict, factor_names: list[str]) -> np.ndarray:
+        """
+        Factor weights in matrix column order, normalized to add up to 1.
+        Factors without a weight get 0; all-zero weights weigh factors equally.
+        """
+        w: np.ndarray = np.array(
+            [weights.get(f, 0.0) for f in factor_names], dtype=float
+        )
+        total_w: float = float(w.sum())
         if total_w == 0:
-            n: int = len(weights)
-            weights = {k: 1 / n for k in weights}
-        else:
-            weights = {k: v / total_w for k, v in weights.items()}
+            return np.full(len(factor_names), 1 / len(factor_names))
+        return w / total_w
 
-        composite: dict = {}
+    def composite_array(
+        self,
+        weights: dict,
+        matrix: np.ndarray | None = None,
+        mask: np.ndarray | None = None,
+        factor_names: list[str] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Composite score per ticker and a mask of tickers with at least one factor.
+        Missing factors contribute nothing.
+        """
+        if matrix is None:
+            entry: CachedRanking = self.cached_ranking(weights)
+            return entry.composite, entry.present
 
-        for ticker in self.factor_calc.universe:
-            ticker = ticker
-            score_sum = 0
-            count = 0
+        w: np.ndarray = self.weight_vector(weights, factor_names)
+        return matrix @ w, mask.any(axis=1)
+
+    def order(self, composite: np.ndarray, present: np.ndarray) -> np.ndarray:
+        """
+        Indices of present tickers sorted by composite score (highest first).
+        Ties keep universe order.
+        """
+        candidates: np.ndarray = np.flatnonzero(present)
+        return candidates[np.argsort(-composite[candidates], kind="stable")]
 
-            for factor, score in self.scores.items():
-                value = score.get(ticker)
-                if value is None:
-                    continue
+    def top_k(self, values: np.ndarray, k: int) -> np.ndarray:
+        """
+        Positions of the k highest values, ordered by value then position.
+        Every value tied with the k-th is considered before the cut, so the
+        result is exactly the first k entries of the full stable ordering.
+        """
+        k = min(k, len(values))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
 
-                score_sum += value * weights[factor]
-                count += 1
+        if k < len(values):
+            kth: float = np.partition(-values, k - 1)[k - 1]
+            top: np.ndarray = np.flatnonzero(-values <= kth)
+        else:
+            top = np.arange(len(values))
 
-            if count == 0:
-                continue
+        return top[np.lexsort((top, -values[top]))][:k]
 
-            composite[ticker] = score_sum
+    def select(
+        self,
+        composite: np.ndarray,
+        present: np.ndarray,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> np.ndarray:
+        """
+        Indices for ranks [offset, offset + limit) using partial selection:
+        only the first offset + limit entries are fully ordered.
+        """
+        candidates: np.ndarray = np.flatnonzero(present)
+        if limit is None:
+            return self.order(composite, present)[offset:]
+
+        top: np.ndarray = self.top_k(composite[candidates], offset + limit)
+        return candidates[top][offset:]
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+
+    def compute_composite_scores(
+        self, weights: dict, scores: dict[str, Any] | None = None
+    ) -> dict:
+        """
+        Combine factor scores into a single score per stock.
+        Factor weights are normalized to add up to 1.
+        Uses the loaded snapshot unless explicit scores are given.
+        """
+        if scores is None:
+            composite, present = self.composite_array(weights)
+            tickers: list[str] = self.tickers
+        else:
+            tickers, factor_names, matrix, mask = self.matrix_from_scores(scores)
+            composite, present = self.composite_array(
+                weights, matrix, mask, factor_names
+            )
 
-        return composite
+        return {tickers[i]: float(composite[i]) for i in np.flatnonzero(present)}
 
     def rank_stocks(self, composite_scores: dict) -> list:
         """
         Rank stocks by composite score (highest to lowest).
         """
-        return sorted(composite_scores.items(), key=lambda x: x[1], reverse=True)
+        tickers: list = list(composite_scores)
+        values: np.ndarray = np.fromiter(
+            composite_scores.values(), dtype=float, count=len(tickers)
+        )
+        order: np.ndarray = np.argsort(-values, kind="stable")
+        return [(tickers[i], float(values[i])) for i in order]
+
+    def rank_page(
+        self,
+        weights: dict,
+        offset: int = 0,
+        limit: int | None = None,
+        sectors: list[str] | None = None,
+        min_market_cap: float | None = None,
+        max_per_sector: int | None = None,
+    ) -> tuple[list, int]:
+        """
+        One page of the (optionally constrained) ranking plus the total
+        number of ranked tickers that satisfy the constraints.
+        """
+        rows, composite, total = self.page_rows(
+            weights, offset, limit, sectors, min_market_cap, max_per_sector
+        )
+        page: list = [(self.tickers[i], float(composite[i])) for i in rows]
+        return page, total
+
+    def page_rows(
+        self,
+        weights: dict,
+        offset: int = 0,
+        limit: int | None = None,
+        sectors: list[str] | None = None,
+        min_market_cap: float | None = None,
+        max_per_sector: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Row indices of one ranking page, the composite array they index into
+        and the constrained total. Lets callers encode pages without tuples.
+        """
+        entry: CachedRanking = self.cached_ranking(weights)
+        end: int | None = None if limit is None else offset + limit
+
+        filtered: bool = sectors is not None or min_market_cap is not None
+        eligible: np.ndarray = entry.present
+        if filtered:
+            eligible = eligible & self.constraint_mask(sectors, min_market_cap)
+
+        if max_per_sector is not None:
+            order: np.ndarray = self.full_order(entry)
+            if filtered:
+                order = order[eligible[order]]
+            order = self.cap_per_sector(order, max_per_sector)
+            rows: np.ndarray = order[offset:end]
+            total: int = len(order)
+
+        elif entry.order is not None or limit is None:
+            order = self.full_order(entry)
+            if filtered:
+                order = order[eligible[order]]
+            rows = order[offset:end]
+            total = len(order)
+
+        else:
+            rows = self.select(entry.composite, eligible, offset, limit)
+            total = int(eligible.sum())
+
+        return rows, entry.composite, total
+
+    def ticker_rank(self, ticker: str, weights: dict) -> dict[str, Any] | None:
+        """
+        Composite score, rank, percentile and per-factor contributions of a
+        single ticker, using one counting pass instead of a sort.
+        Returns None if the ticker is not ranked.
+        """
+        entry: CachedRanking = self.cached_ranking(weights)
+        row: int | None = self.ticker_index.get(ticker)
+        if row is None or not entry.present[row]:
+            return None
+
+        composite: np.ndarray = entry.composite
+        score: float = composite[row]
+        present: np.ndarray = entry.present
+
+        # Ties are ordered by universe position, as in the full ranking
+        ahead: np.ndarray = present & (
+            (composite > score)
+            | ((composite == score) & (np.arange(len(composite)) < row))
+        )
+        rank: int = int(ahead.sum()) + 1
+        total: int = int(present.sum())
+        percentile: float = 100.0 * (total - rank) / (total - 1) if total > 1 else 100.0
+
+        w: np.ndarray = self.weight_vector(weights, self.factor_names)
+        factors: dict[str, Any] = {}
+        for j, name in enumerate(self.factor_names):
+            has: bool = bool(self.mask[row, j])
+            factors[name] = {
+                "score": float(self.matrix[row, j]) if has else None,
+                "weight": float(w[j]),
+                "contribution": float(self.matrix[row, j] * w[j]) if has else None,
+            }
+
+        return {
+            "ticker": ticker,
+            "composite": float(score),
+            "rank": rank,
+            "total": total,
+            "percentile": percentile,
+            "factors": factors,
+        }
+
+    def ticker_detail(self, ticker: str) -> dict[str, Any] | None:
+        """
+        Derived metrics, factor scores with sector ranks, and winsorized signal
+        values of one ticker, read from the loaded snapshot's indexes.
+        Returns None if the ticker is not in the snapshot.
+        """
+        row: int | None = self.ticker_index.get(ticker)
+        if row is None:
+            return None
+
+        code: int = int(self.sector_codes[row])
+        sector: str | None = self.sectors[code] if code >= 0 else None
+
+        factors: dict[str, Any] = {}
+        for j, name in enumerate(self.factor_names):
+            ranked: bool = bool(self.sector_ranks[row, j])
+            factors[name] = {
+                "score": float(self.matrix[row, j]) if self.mask[row, j] else None,
+                "sector_rank": int(self.sector_ranks[row, j]) if ranked else None,
+                "sector_size": int(self.sector_counts[code, j]) if ranked else None,
+            }
+
+        signals: dict[str, Any] = {}
+        for j, name in enumerate(self.signal_names):
+            winsorized: float = self.winsorized[row, j]
+            z: float = self.signal_z[row, j]
+            signals[name] = {
+                "winsorized": None if np.isnan(winsorized) else float(winsorized),
+                "z": None if np.isnan(z) else float(z),
+            }
+
+        return {
+            "ticker": ticker,
+            "sector": sector,
+            "version": self.scores_version,
+            "metrics": self.factor_calc.metrics.get(ticker),
+            "factors": factors,
+            "signals": signals,
+        }
 
     def top_n(self, n: int, weights) -> list:
         """
         Method that returns top-N ranked stocks.
         """
-        if not self.scores:
-            self.load_factor_scores()
+        return self.rank_page(weights, limit=n)[0]
+
+    def rank_scenarios(self, scenarios: list[dict], n: int) -> dict[str, Any]:
+        """
+        Ranks K weight scenarios at once with a single matrix–matrix product.
+        Returns top-N per scenario, pairwise top-N overlap and how often each
+        ticker appears across scenarios.
+        """
+        self.ensure_loaded()
+        if not scenarios:
+            return {"scenarios": [], "overlap": [], "consensus": []}
+
+        w: np.ndarray = np.column_stack(
+            [self.weight_vector(s, self.factor_names) for s in scenarios]
+        )
+        composite: np.ndarray = self.matrix @ w
+        present: np.ndarray = self.mask.any(axis=1)
+
+        candidates: np.ndarray = np.flatnonzero(present)
+        k: int = max(0, min(n, len(candidates)))
+
+        # Same deterministic top-k as select(), one scenario per column
+        top_rows: np.ndarray = np.column_stack(
+            [
+                candidates[self.top_k(composite[candidates, j], k)]
+                for j in range(len(scenarios))
+            ]
+        ).reshape(k, len(scenarios))
+        top_values: np.ndarray = np.take_along_axis(composite, top_rows, axis=0)
+
+        membership: np.ndarray = np.zeros((len(scenarios), len(self.tickers)))
+        np.put_along_axis(membership, top_rows.T, 1.0, axis=1)
+        shared: np.ndarray = membership @ membership.T
+        overlap: np.ndarray = shared / k if k else shared
+
+        frequency: np.ndarray = membership.sum(axis=0)
+        consensus: np.ndarray = np.argsort(-frequency, kind="stable")
+        consensus = consensus[frequency[consensus] > 0]
+
+        return {
+            "scenarios": [
+                {
+                    "weights": scenarios[j],
+                    "top": [
+                        (self.tickers[i], float(v))
+                        for i, v in zip(top_rows[:, j], top_values[:, j])
+                    ],
+                }
+                for j in range(len(scenarios))
+            ],
+            "overlap": overlap.tolist(),
+            "consensus": [(self.tickers[i], int(frequency[i])) for i in consensus[:n]],
+        }
+
+    def rank_as_of(self, as_of: date, weights: dict) -> list:
+        """
+        Ranks stocks using the stored factor snapshot as of the given date.
+        """
+        scores: dict[str, Any] = self.factor_calc.scores_as_of(as_of)
+        if not scores:
+            return []
 
-        comp: dict = self.compute_composite_scores(weights)
-        ranked: list = self.rank_stocks(comp)
-        return ranked[:n]
+        comp: dict = self.compute_composite_scores(weights, scores)
+        return self.rank_stocks(comp)
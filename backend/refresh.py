@@ -0,0 +1,323 @@
+"""
+refresh.py
+
+Command-line warm-up of the DataStore. Fetches (or loads from cache) the
+selected raw categories for every ticker of a universe in parallel, and
+checkpoints each completed (ticker, category) pair so an interrupted run
+resumes where it stopped (the checkpoint is dropped once a run finishes), e.g.:
+
+    python -m backend.refresh --workers 8
+    python -m backend.refresh --categories price_history,fundamentals --refetch
+    python -m backend.refresh --metrics
+    python -m backend.refresh --plan
+
+Financial statements are fetched per ticker but cleaned in batches of
+--batch-size tickers per category. With --plan, they are only fetched where
+the cached data suggests a new reporting period could be available.
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import date
+from typing import Any
+
+from backend.data.provider import Provider
+from backend.data.refresh_planner import STATEMENT_CATEGORIES, RefreshPlanner
+from backend.data.universe import load_sp500_universe
+from backend.data_store.storage import DataStore
+from backend.fundamentals.fundamental_calculator import FundamentalCalculator
+from backend.metrics.metric_builder import MetricBuilder
+
+CATEGORIES: tuple[str, ...] = (
+    "price_history",
+    "fundamentals",
+    "balance_sheet",
+    "quarterly_balance_sheet",
+    "income_statement",
+    "quarterly_income_statement",
+    "ttm_income_statement",
+    "cashflow",
+    "quarterly_cashflow",
+    "ttm_cashflow",
+    "metadata",
+)
+
+# Needed for beta; warmed whenever price history is
+BENCHMARK: str = "SPY"
+
+
+class WarmUpJob:
+    """
+    One resumable warm-up run over (ticker, category) pairs.
+    """
+
+    def __init__(
+        self,
+        store: DataStore,
+        provider: Provider,
+        job: str = "warm_up",
+        workers: int = 4,
+        progress_every: int = 100,
+        batch_size: int = 50,
+    ) -> None:
+        self.store: DataStore = store
+        self.provider: Provider = provider
+        self.job: str = job
+        self.workers: int = workers
+        self.progress_every: int = progress_every
+        self.batch_size: int = batch_size
+
+    def completed(self) -> set[tuple[str, str]]:
+        return {
+            (r["ticker"], r["category"])
+            for r in self.store.load_checkpoint(self.job)
+            if r.get("status") == "ok"
+        }
+
+    def finish(self) -> None:
+        """
+        Drops the checkpoint once every pair has been attempted, so the next
+        run under this name starts over instead of skipping everything.
+        """
+        self.store.clear_checkpoint(self.job)
+
+    def batches(self, pairs: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+        """
+        Units of work: statement pairs in chunks of batch_size tickers per
+        category, cleaned together; every other pair on its own.
+        """
+        batches: list[list[tuple[str, str]]] = []
+        statements: dict[str, list[str]] = {}
+        for ticker, category in pairs:
+            if category in STATEMENT_CATEGORIES:
+                statements.setdefault(category, []).append(ticker)
+            else:
+                batches.append([(ticker, category)])
+
+        for category, tickers in statements.items():
+            for start in range(0, len(tickers), self.batch_size):
+                chunk: list[str] = tickers[start : start + self.batch_size]
+                batches.append([(t, category) for t in chunk])
+        return batches
+
+    def warm(self, batch: list[tuple[str, str]]) -> dict[tuple[str, str], str | None]:
+        """
+        Warms one batch and returns the error of each pair (None if warmed).
+        """
+        category: str = batch[0][1]
+        if category in STATEMENT_CATEGORIES:
+            results: dict[str, Any] = self.provider.get_statements(
+                category, [t for t, _ in batch]
+            )
+            return {
+                (t, category): str(r) if isinstance(r, Exception) else None
+                for t, r in results.items()
+            }
+
+        ticker: str = batch[0][0]
+        try:
+            getattr(self.provider, f"get_{category}")(ticker)
+        except Exception as e:
+            return {(ticker, category): str(e)}
+        return {(ticker, category): None}
+
+    def run(self, pairs: list[tuple[str, str]]) -> dict[str, Any]:
+        """
+        Warms every pending pair and returns a throughput and failure summary.
+        """
+        done: set[tuple[str, str]] = self.completed()
+        pending: list[tuple[str, str]] = [p for p in pairs if p not in done]
+
+        print(
+            f"{len(pairs)} pairs, {len(pairs) - len(pending)} already done, "
+            f"{len(pending)} to warm with {self.workers} workers"
+        )
+
+        ok: int = 0
+        failures: list[dict[str, Any]] = []
+        started: float = time.perf_counter()
+        finished: int = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures: dict[Future, list[tuple[str, str]]] = {
+                executor.submit(self.warm, batch): batch
+                for batch in self.batches(pending)
+            }
+
+            for future in as_completed(futures):
+                try:
+                    errors: dict[tuple[str, str], str | None] = future.result()
+                except Exception as e:
+                    errors = {pair: str(e) for pair in futures[future]}
+
+                for (ticker, category), error in errors.items():
+                    record: dict[str, Any] = {"ticker": ticker, "category": category}
+                    if error is None:
+                        record["status"] = "ok"
+                        ok += 1
+                    else:
+                        record.update(status="failed", error=error)
+                        failures.append(record)
+
+                    record["at"] = time.time()
+                    self.store.append_checkpoint(self.job, record)
+
+                    finished += 1
+                    if finished % self.progress_every == 0:
+                        rate: float = finished / (time.perf_counter() - started)
+                        print(
+                            f"{finished}/{len(pending)} pairs ({rate:.1f}/s), "
+                            f"{len(failures)} failed"
+                        )
+
+        elapsed: float = time.perf_counter() - started
+        return {
+            "pairs": len(pairs),
+            "skipped": len(pairs) - len(pending),
+            "warmed": ok,
+            "failed": len(failures),
+            "elapsed_seconds": elapsed,
+            "pairs_per_second": len(pending) / elapsed if elapsed > 0 else 0.0,
+            "failures_by_category": dict(Counter(f["category"] for f in failures)),
+            "failures": failures,
+        }
+
+
+def print_summary(summary: dict[str, Any], max_failures: int = 20) -> None:
+    print(
+        f"Warmed {summary['warmed']} pairs, skipped {summary['skipped']}, "
+        f"failed {summary['failed']} in {summary['elapsed_seconds']:.1f}s "
+        f"({summary['pairs_per_second']:.1f} pairs/s)"
+    )
+    for category, count in sorted(summary["failures_by_category"].items()):
+        print(f"  {category}: {count} failed")
+    for failure in summary["failures"][:max_failures]:
+        print(f"  {failure['ticker']} {failure['category']}: {failure['error']}")
+    if summary["failed"] > max_failures:
+        print(f"  ... {summary['failed'] - max_failures} more")
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.refresh", description=__doc__.split("\n\n")[1]
+    )
+    parser.add_argument("--data-store", default="./data_store")
+    parser.add_argument(
+        "--universe",
+        default="backend/data/sp_500.csv",
+        help="CSV of tickers (first column, or Symbol/Ticker)",
+    )
+    parser.add_argument(
+        "--tickers", default=None, help="comma-separated tickers instead of --universe"
+    )
+    parser.add_argument(
+        "--categories",
+        default=",".join(CATEGORIES),
+        help="comma-separated raw categories to warm (default: all)",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=50,
+        help="tickers per batch when cleaning financial statements",
+    )
+    parser.add_argument(
+        "--refetch",
+        action="store_true",
+        help="fetch fresh data even when cached (cache kept on failure)",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="also build derived metrics and the universe snapshot the API "
+        "rebuilds its factors from on the next start",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="refetch only statements that could have a new reporting period",
+    )
+    parser.add_argument(
+        "--job",
+        default=None,
+        help="checkpoint name; reruns resume it until it finishes "
+        "(default: warm_up, warm_up-refetch with --refetch, "
+        "or plan-<date> with --plan)",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="discard the checkpoint and start over"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args: argparse.Namespace = parse_args(argv)
+
+    categories: list[str] = [c for c in args.categories.split(",") if c]
+    unknown: list[str] = [c for c in categories if c not in CATEGORIES]
+    if unknown:
+        raise SystemExit(f"Unknown categories: {', '.join(unknown)}")
+
+    tickers: list[str] = (
+        [t.strip().upper().replace(".", "-") for t in args.tickers.split(",")]
+        if args.tickers
+        else load_sp500_universe(args.universe)
+    )
+
+    store: DataStore = DataStore(args.data_store)
+    if args.job:
+        name: str = args.job
+    elif args.plan:
+        name = f"plan-{date.today().isoformat()}"
+    else:
+        name = "warm_up-refetch" if args.refetch else "warm_up"
+    if args.restart:
+        store.clear_checkpoint(name)
+
+    planned: list[tuple[str, str]] = []
+    if args.plan:
+        planned, _ = RefreshPlanner(store).plan(tickers, categories)
+        categories = [c for c in categories if c not in STATEMENT_CATEGORIES]
+
+    provider: Provider = Provider(
+        store,
+        refetch=set(categories) if args.refetch else None,
+        refetch_pairs=set(planned),
+    )
+    job: WarmUpJob = WarmUpJob(
+        store, provider, name, args.workers, batch_size=args.batch_size
+    )
+
+    if "price_history" in categories and BENCHMARK not in tickers:
+        job.run([(BENCHMARK, "price_history")])
+
+    pairs: list[tuple[str, str]] = [(t, c) for t in tickers for c in categories]
+    summary: dict[str, Any] = job.run(pairs + planned)
+    job.finish()
+    print_summary(summary)
+
+    if args.metrics:
+        builder: MetricBuilder = MetricBuilder(FundamentalCalculator(provider), store)
+        metrics: dict[str, Any] = builder.load_universe_metrics(
+            tickers, force_refresh=args.refetch or args.plan
+        )
+        builder.save_universe_snapshot(metrics, tickers)
+        print(
+            f"Built metrics for {builder.progress['done'] - builder.progress['failed']}"
+            f"/{len(tickers)} tickers"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+
+from backend.api.main import app
+from backend.factors.registry import DEFAULT_REGISTRY
+
+# Request validation runs before the handlers, so no snapshot is needed
+client: TestClient = TestClient(app)
+
+
+def test_rank_requires_every_weight() -> None:
+    assert client.post("/rank", json={}).status_code == 422
+
+    weights: dict[str, float] = {name: 1.0 for name in DEFAULT_REGISTRY.factors}
+    weights.pop("momentum")
+    weights["momentun"] = 1.0
+    response = client.post("/rank", json=weights)
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "momentum"]
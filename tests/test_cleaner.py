@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.data.cleaner import (
+    COMPACT_LABELS,
+    STATEMENT_ROWS,
+    clean_statement,
+    clean_statements,
+)
+from backend.data.provider import Provider
+from backend.data_store.storage import DataStore
+
+
+def raw_statement(
+    category: str, rng: np.random.Generator, n_periods: int
+) -> pd.DataFrame:
+    """
+    A statement as the data source returns it: display labels, an extra
+    row, a few rows missing and a column of numbers stored as strings.
+    """
+    rows: list[str] = STATEMENT_ROWS[category]
+    if category in COMPACT_LABELS:
+        labels: list[str] = [r.replace("_", " ").title().replace(" ", "") for r in rows]
+    else:
+        labels = [r.replace("_", " ").title() for r in rows]
+    labels = [label for label in labels if rng.random() > 0.2] + ["Some Other Row"]
+
+    periods: pd.DatetimeIndex = pd.date_range(
+        "2020-12-31", periods=n_periods, freq="YE"
+    )[::-1]
+    df: pd.DataFrame = pd.DataFrame(
+        rng.normal(1e9, 1e8, (len(labels), n_periods)), index=labels, columns=periods
+    )
+    df[periods[0]] = df[periods[0]].astype(str).astype(object)
+    return df
+
+
+@pytest.mark.parametrize(
+    "category", ["balance_sheet", "quarterly_balance_sheet", "ttm_cashflow"]
+)
+def test_batch_cleaning_matches_per_frame(category: str) -> None:
+    rng: np.random.Generator = np.random.default_rng(1)
+    frames: dict[str, pd.DataFrame] = {
+        f"T{i}": raw_statement(category, rng, n_periods=2 + i % 3) for i in range(6)
+    }
+
+    cleaned: dict[str, pd.DataFrame] = clean_statements(category, frames)
+
+    assert list(cleaned) == list(frames)
+    for ticker, df in frames.items():
+        pd.testing.assert_frame_equal(cleaned[ticker], clean_statement(df, category))
+
+
+def test_provider_cleans_fetched_statements_in_one_batch(tmp_path, monkeypatch) -> None:
+    rng: np.random.Generator = np.random.default_rng(2)
+    raw: dict[str, pd.DataFrame] = {
+        t: raw_statement("income_statement", rng, 3) for t in ["AAA", "BBB", "CCC"]
+    }
+
+    def fetch(ticker: str) -> pd.DataFrame:
+        if ticker == "BAD":
+            raise ValueError("boom")
+        return raw[ticker]
+
+    batches: list[list[str]] = []
+
+    def batch(category: str, frames: dict) -> dict:
+        batches.append(list(frames))
+        return clean_statements(category, frames)
+
+    monkeypatch.setattr("backend.data.provider.fetch_income_statement", fetch)
+    monkeypatch.setattr("backend.data.provider.clean_statements", batch)
+
+    store: DataStore = DataStore(str(tmp_path))
+    provider: Provider = Provider(store, max_retries=1, base_delay=0.0)
+    results: dict = provider.get_statements(
+        "income_statement", ["AAA", "BAD", "BBB", "CCC"]
+    )
+
+    assert batches == [["AAA", "BBB", "CCC"]]
+    assert list(results) == ["AAA", "BAD", "BBB", "CCC"]
+    assert isinstance(results["BAD"], Exception)
+    for ticker, df in raw.items():
+        expected: pd.DataFrame = clean_statement(df, "income_statement")
+        pd.testing.assert_frame_equal(results[ticker], expected)
+        pd.testing.assert_frame_equal(
+            store.load_df(ticker, "income_statement"), expected, check_freq=False
+        )
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+from backend.factors.normalizer import NormalizedSignals, SectorNormalizer
+
+SECTORS: list[str] = ["Energy", "Healthcare", "Technology", "Utilities", "Tiny"]
+
+
+def synthetic_universe(
+    rng: np.random.Generator, n_tickers: int, n_signals: int
+) -> tuple[list[str], dict[str, str], np.ndarray]:
+    """
+    Heavy-tailed signals with ~5% missing cells. "Tiny" has two tickers so
+    updates regularly push it below the sector-size threshold, and a few
+    tickers have no sector (global fallback).
+    """
+    universe: list[str] = [f"T{i:04d}" for i in range(n_tickers)]
+    sector_map: dict[str, str] = {}
+    for i, ticker in enumerate(universe):
+        if i < 2:
+            sector_map[ticker] = "Tiny"
+        elif i % 17 != 0:
+            sector_map[ticker] = SECTORS[i % 4]
+
+    raw: np.ndarray = rng.standard_t(3, size=(n_tickers, n_signals))
+    raw[rng.random(raw.shape) < 0.05] = np.nan
+    return universe, sector_map, raw
+
+
+def random_update(
+    rng: np.random.Generator, n_signals: int, current: str | None
+) -> tuple[np.ndarray, str | None]:
+    values: np.ndarray = rng.standard_t(3, size=n_signals) * rng.choice([1, 1, 10])
+    values[rng.random(n_signals) < 0.1] = np.nan
+
+    move: float = rng.random()
+    if move < 0.15:
+        sector: str | None = None
+    elif move < 0.35:
+        sector = str(rng.choice(SECTORS))
+    else:
+        sector = current
+    return values, sector
+
+
+def max_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Largest absolute difference, treating NaN == NaN and inf == inf as equal
+    and a NaN mismatch as infinite.
+    """
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return np.inf
+    both: np.ndarray = ~np.isnan(a) & np.isfinite(a) & np.isfinite(b)
+    if not np.array_equal(np.isinf(a), np.isinf(b)):
+        return np.inf
+    return float(np.max(np.abs(a[both] - b[both]), initial=0.0))
+
+
+def run_check(
+    n_tickers: int = 300,
+    n_signals: int = 8,
+    n_updates: int = 300,
+    seed: int = 0,
+    tolerance: float = 1e-9,
+    max_changed_fraction: float = 0.1,
+) -> float:
+    """
+    Applies n_updates random updates and returns the largest deviation from
+    a full recompute. Raises AssertionError past the tolerance.
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    universe, sector_map, raw = synthetic_universe(rng, n_tickers, n_signals)
+
+    normalizer: SectorNormalizer = SectorNormalizer(universe, sector_map)
+    signals: NormalizedSignals = NormalizedSignals(
+        normalizer, raw, max_changed_fraction=max_changed_fraction
+    )
+
+    # Fixed cases first: sector moves with unchanged values, then with new ones
+    no_sector: int = next(i for i, t in enumerate(universe) if t not in sector_map)
+    other: str = "Energy" if sector_map[universe[2]] != "Energy" else "Technology"
+    scripted: list[tuple[int, str | None, bool]] = [
+        (2, other, True),  # sector -> sector
+        (no_sector, "Healthcare", True),  # no sector -> sector
+        (0, None, True),  # sector -> no sector, shrinks "Tiny" below 2
+        (2, None, False),
+        (no_sector, "Utilities", False),
+        (0, "Tiny", False),
+    ]
+
+    worst: float = 0.0
+    for step in range(len(scripted) + n_updates):
+        if step < len(scripted):
+            row, sector, same = scripted[step]
+            values: np.ndarray = raw[row].copy()
+            if not same:
+                values += rng.normal(size=n_signals)
+        else:
+            row = int(rng.integers(n_tickers))
+            values, sector = random_update(
+                rng, n_signals, sector_map.get(universe[row])
+            )
+
+        if sector is not None and sector not in normalizer.sector_codes:
+            continue  # unknown sectors trigger a full rebuild in FactorCalculator
+
+        raw[row] = values
+        if sector is None:
+            sector_map.pop(universe[row], None)
+        else:
+            sector_map[universe[row]] = sector
+        signals.update_row(row, values, normalizer.code_for(sector))
+
+        expected: NormalizedSignals = NormalizedSignals(
+            SectorNormalizer(universe, sector_map), raw
+        )
+        error: float = max(
+            max_difference(signals.lower, expected.lower),
+            max_difference(signals.upper, expected.upper),
+            max_difference(signals.winsorized, expected.winsorized),
+            max_difference(signals.z, expected.z),
+        )
+        worst = max(worst, error)
+        if error > tolerance:
+            raise AssertionError(
+                f"Step {step} (row {row}, sector {sector}): incremental result "
+                f"differs from a full recompute by {error:.3g}"
+            )
+
+    return worst
+
+
+@pytest.mark.parametrize("max_changed_fraction", [0.1, 1.0])
+def test_incremental_updates_match_full_recompute(
+    max_changed_fraction: float,
+) -> None:
+    # 0.1 is the default rebuild threshold; 1.0 forces the incremental path
+    worst: float = run_check(max_changed_fraction=max_changed_fraction)
+    assert worst <= 1e-9
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from backend.ranking.ranking_engine import RankingEngine
+
+FACTORS: list[str] = ["value", "size", "momentum"]
+
+
+class StubFactors:
+    """
+    Minimal factor source for RankingEngine: a fixed tickers × factors matrix.
+    """
+
+    def __init__(self, matrix: np.ndarray) -> None:
+        n_rows: int = matrix.shape[0]
+        self.metrics_version: str = "test"
+        self.universe: list[str] = [f"T{i:03d}" for i in range(n_rows)]
+        self.factor_names: list[str] = FACTORS
+        self.signal_names: list[str] = []
+        self.sector_map: dict[str, str] = {
+            t: ["Energy", "Technology"][i % 2] for i, t in enumerate(self.universe)
+        }
+        self.metrics: dict[str, dict] = {
+            t: {"market_cap": float(i + 1)} for i, t in enumerate(self.universe)
+        }
+        self.matrix: np.ndarray = matrix
+
+    def factor_matrix(self) -> np.ndarray:
+        return self.matrix
+
+    def signal_matrices(self) -> tuple[np.ndarray, np.ndarray]:
+        empty: np.ndarray = np.empty((len(self.universe), 0))
+        return empty, empty
+
+    def dense_factors(self) -> tuple[np.ndarray, np.ndarray]:
+        mask: np.ndarray = ~np.isnan(self.matrix)
+        return np.where(mask, self.matrix, 0.0), mask
+
+    def sector_index(self) -> tuple[list[str], np.ndarray]:
+        sectors: list[str] = sorted(set(self.sector_map.values()))
+        return sectors, np.array(
+            [sectors.index(self.sector_map[t]) for t in self.universe]
+        )
+
+    def market_caps(self) -> np.ndarray:
+        return np.array([self.metrics[t]["market_cap"] for t in self.universe])
+
+    def factor_scores(self) -> dict[str, dict]:
+        return {
+            name: {
+                t: (None if np.isnan(v) else float(v))
+                for t, v in zip(self.universe, self.matrix[:, j])
+            }
+            for j, name in enumerate(self.factor_names)
+        }
+
+
+def tied_engine(n_rows: int = 500, n_tied: int = 69, seed: int = 0) -> RankingEngine:
+    """
+    Engine whose "value" scores tie at 2.0 (around the top 2%) for n_tied
+    tickers, with a few tickers missing every factor.
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    matrix: np.ndarray = rng.normal(size=(n_rows, len(FACTORS)))
+    matrix[rng.choice(n_rows, n_tied, replace=False), 0] = 2.0
+    matrix[rng.choice(n_rows, 5, replace=False)] = np.nan
+    return RankingEngine(StubFactors(matrix))
+
+
+@pytest.mark.parametrize("limit", [5, 20, 50])
+def test_pages_with_ties_match_full_order(limit: int) -> None:
+    engine: RankingEngine = tied_engine()
+    weights: dict[str, float] = {"value": 1}
+
+    pages: list[int] = []
+    offset: int = 0
+    while True:
+        rows, _, total = engine.page_rows(weights, offset, limit)
+        if not len(rows):
+            break
+        pages.extend(rows.tolist())
+        offset += limit
+
+    entry = engine.cached_ranking(weights)
+    assert entry.order is None  # every page above used partial selection
+    assert pages == engine.full_order(entry).tolist()
+    assert len(pages) == total
+
+    # Same pages once the full order is cached
+    for start in range(0, total, limit):
+        rows, _, _ = engine.page_rows(weights, start, limit)
+        assert rows.tolist() == pages[start : start + limit]
+
+
+def test_top_k_keeps_every_tie_before_the_cut() -> None:
+    engine: RankingEngine = tied_engine(n_rows=10, n_tied=0)
+    values: np.ndarray = np.array([1.0, 3.0, 2.0, 2.0, 2.0, 0.0, 2.0])
+
+    assert engine.top_k(values, 3).tolist() == [1, 2, 3]
+    assert engine.top_k(values, 0).tolist() == []
+    assert engine.top_k(values, 99).tolist() == [1, 2, 3, 4, 6, 0, 5]
+
+
+@pytest.mark.parametrize("n", [5, 20, 50])
+def test_scenarios_match_rank_page_with_ties(n: int) -> None:
+    engine: RankingEngine = tied_engine()
+    scenarios: list[dict[str, float]] = [{"value": 1}, {"size": 1}]
+
+    result: dict = engine.rank_scenarios(scenarios, n)
+    for weights, scenario in zip(scenarios, result["scenarios"]):
+        page, _ = engine.rank_page(weights, limit=n)
+        assert scenario["top"] == page
+
+
+def test_scenarios_with_zero_n_are_empty() -> None:
+    engine: RankingEngine = tied_engine()
+
+    result: dict = engine.rank_scenarios([{"value": 1}, {"size": 1}], 0)
+    assert [s["top"] for s in result["scenarios"]] == [[], []]
+    assert result["consensus"] == []
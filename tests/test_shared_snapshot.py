@@ -0,0 +1,48 @@
+import numpy as np
+
+from backend.data_store.storage import DataStore
+from backend.factors.factor_model import FactorCalculator
+from backend.factors.shared_snapshot import SharedFactorSnapshot
+from backend.loadtest import synthetic_metrics
+from backend.ranking.ranking_engine import RankingEngine
+
+WEIGHTS: dict[str, float] = {
+    "value": 0.2,
+    "size": 0.2,
+    "momentum": 0.2,
+    "lowvol": 0.15,
+    "quality": 0.15,
+    "market_risk": 0.1,
+}
+
+
+def test_shared_snapshot_ranks_from_mapped_arrays(tmp_path) -> None:
+    store: DataStore = DataStore(str(tmp_path))
+    universe: list[str] = [f"T{i:03d}" for i in range(300)]
+    computed: FactorCalculator = FactorCalculator(
+        None, metrics=synthetic_metrics(universe, seed=3)
+    )
+    version: str = SharedFactorSnapshot.write(store, computed)
+
+    shared: SharedFactorSnapshot = SharedFactorSnapshot(store, version)
+    engine: RankingEngine = RankingEngine(shared)
+    engine.ensure_loaded()
+
+    # The engine reads the mapped arrays as they are, without copies or dicts
+    for array in (engine.matrix, engine.mask, engine.sector_codes):
+        assert isinstance(array, np.memmap)
+        assert not array.flags.writeable
+    assert shared.metrics_cache is None
+    assert shared.score_cache is None
+
+    expected: RankingEngine = RankingEngine(computed)
+    assert engine.rank_page(WEIGHTS, limit=50) == expected.rank_page(WEIGHTS, limit=50)
+    assert engine.rank_page(
+        WEIGHTS, limit=20, sectors=["Technology"], min_market_cap=1e10
+    ) == expected.rank_page(
+        WEIGHTS, limit=20, sectors=["Technology"], min_market_cap=1e10
+    )
+
+    # Per-ticker metrics are only read for ticker detail
+    assert engine.ticker_detail("T007") == expected.ticker_detail("T007")
+    assert shared.metrics_cache is not None